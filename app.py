@@ -1,101 +1,187 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
 from datetime import datetime
 import os
-import gspread
+import uuid
 import pytz
-from streamlit_gsheets import GSheetsConnection
+from streamlit.errors import StreamlitAPIException
+from armazenamento import obter_armazenamento
+from bases import derivar_bases, obter_snapshot
+from diagnostico import DIAG, medir
+from esquema import COLUNAS_RESPOSTAS
+from exportacao import obter_exportacoes, planilha_excel
+from importacao import ValidadorImportacao, importar
+from indices import padroes_por_cpf
+from escopo import obter_escopos
+from painel import performance_auditores, status_por_pessoa, volumetria_por_padrao
+from fila_gravacao import obter_fila
+from respostas import novo_carimbo, obter_respostas
 
 # --- 1. CONFIGURAÇÃO ---
 st.set_page_config(page_title="DTO 01 - DCS SCANIA", page_icon="🚛", layout="wide")
 
 # --- 2. MEMÓRIA ---
-if 'resultados' not in st.session_state: st.session_state['resultados'] = []
 if 'pagina_atual' not in st.session_state: st.session_state['pagina_atual'] = 0
 if 'auditor_logado' not in st.session_state: st.session_state['auditor_logado'] = None
 if 'permissoes' not in st.session_state: 
     st.session_state['permissoes'] = {'filiais': [], 'padroes': [], 'perfil': ''}
 if 'lista_auditores' not in st.session_state: st.session_state['lista_auditores'] = []
+if 'envios' not in st.session_state: st.session_state['envios'] = []
+if 'submissoes' not in st.session_state: st.session_state['submissoes'] = {}
 
 # --- 3. FUNÇÕES ---
 def obter_hora():
     return datetime.now(pytz.timezone('America/Sao_Paulo')).strftime("%d/%m/%Y %H:%M")
 
 def gerar_excel(df_input):
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine='xlsxwriter') as writer:
-        df_input.to_excel(writer, index=False)
-    return out.getvalue()
-
-def achar_coluna(df, termo):
-    for col in df.columns:
-        if termo.lower() in col.lower(): return col
-    return None
-
-def limpar_texto(df, coluna):
-    if coluna in df.columns:
-        df[coluna] = df[coluna].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-    return df
-
-# --- CACHE INTELIGENTE ---
-@st.cache_data(ttl=600, show_spinner="Lendo Bases...")
+    return planilha_excel([("Sheet1", df_input)])
+
+# --- BASES: cópia local servida na hora, atualizada em segundo plano ---
 def carregar_bases_estaticas():
-    try:
-        conn = st.connection("gsheets", type=GSheetsConnection)
-        df_t = conn.read(worksheet="Base_Treinamentos")
-        df_p = conn.read(worksheet="Padroes_Perguntas")
-        try: df_a = conn.read(worksheet="Cadastro_Auditores")
-        except: df_a = None
-        
-        # Limpeza
-        for df in [df_t, df_p]:
-            df.dropna(how='all', inplace=True)
-            df.columns = [c.strip() for c in df.columns]
-            col_f = achar_coluna(df, 'filial'); 
-            if col_f: df = limpar_texto(df, col_f)
-            col_c = achar_coluna(df, 'cpf'); 
-            if col_c: df = limpar_texto(df, col_c)
-            col_p = achar_coluna(df, 'padrao') or achar_coluna(df, 'codigo'); 
-            if col_p: df = limpar_texto(df, col_p)
-            col_pg = achar_coluna(df, 'pergunta'); 
-            if col_pg: df = limpar_texto(df, col_pg)
-        
-        if df_a is not None:
-            df_a.dropna(how='all', inplace=True)
-            df_a.columns = [c.strip() for c in df_a.columns]
-            c_cpf_aud = achar_coluna(df_a, 'cpf')
-            if c_cpf_aud: df_a = limpar_texto(df_a, c_cpf_aud)
+    snap = obter_snapshot()
+    if snap.bases is None:
+        with st.spinner("Lendo Bases..."): return snap.obter()
+    return snap.obter()
+
+# --- DERIVADOS DAS BASES (calculados uma vez por versão dos dados) ---
+@st.cache_resource(max_entries=3, show_spinner=False)
+def derivados_bases(versao, _b):
+    return derivar_bases(_b)
+
+# --- EXECUÇÃO EM FRAGMENTOS ---
+# A paginação e o formulário de cada pessoa rodam como fragmentos: clicar nas setas
+# ou salvar uma pessoa reexecuta só aquele pedaço, não o app inteiro. O formulário
+# só é montado quando o expander da pessoa está aberto.
+OPCOES_RESP = ["Conforme", "Não Conforme", "Não se Aplica"]
+
+def rerun_fragmento():
+    # scope="fragment" só vale quando o próprio fragmento está sendo reexecutado
+    try: st.rerun(scope="fragment")
+    except StreamlitAPIException: st.rerun()
+
+def mudar_pagina(delta, tot_p):
+    st.session_state['pagina_atual'] = min(max(0, st.session_state['pagina_atual'] + delta), tot_p - 1)
+
+@st.fragment
+def lista_execucao(rank, c_cpf, c_nom, c_fil, pads_cpf, abrir_auto, base_resp, derivados):
+    tot_p = (len(rank)-1)//10 + 1
+    st.session_state['pagina_atual'] = min(st.session_state['pagina_atual'], tot_p - 1)
+    c1,c2,c3 = st.columns([1,3,1])
+    c1.button("⬅️", on_click=mudar_pagina, args=(-1, tot_p))
+    c3.button("➡️", on_click=mudar_pagina, args=(1, tot_p))
+    c2.markdown(f"<div style='text-align:center'>Pág {st.session_state['pagina_atual']+1}/{tot_p}</div>", unsafe_allow_html=True)
+    
+    pg_rank = rank.iloc[st.session_state['pagina_atual']*10 : (st.session_state['pagina_atual']+1)*10]
+    with medir('form.pagina') as m:
+        m.linhas = len(pg_rank)
+        for cpf, nome, fil, qtd_pads in zip(pg_rank[c_cpf], pg_rank[c_nom], pg_rank[c_fil], pg_rank['Qtd']):
+            cpf = str(cpf).strip()
+            formulario_pessoa(cpf, nome, fil, qtd_pads, pads_cpf.get(cpf, []), abrir_auto, base_resp, derivados)
+
+@st.fragment
+def formulario_pessoa(cpf, nome, fil, qtd_pads, pads_nf, abrir_auto, base_resp, derivados):
+    idx_perg, dict_metas = derivados['perguntas'], derivados['metas']
+    meta_total = sum(dict_metas.get(p,0) for p in pads_nf)
+    resp_tot = base_resp.contar(cpf, pads_nf)
+    
+    if resp_tot == 0: icon = "⚪"
+    elif resp_tot >= meta_total and meta_total > 0: icon = "🟢"
+    else: icon = "🟡"
+    
+    exp = st.expander(f"{icon} {nome} | {fil} ({qtd_pads} Padrões | {resp_tot}/{meta_total})", expanded=abrir_auto, key=f"x_{cpf}", on_change="rerun")
+    if not exp.open: return
+    backup = None
+    with exp:
+        with st.form(key=f"f_{cpf}"):
+            mem = base_resp.preenchimento(cpf)
+            alerta_topo = st.empty()
+            c_top, _ = st.columns([1, 4])
+            submit_top = c_top.form_submit_button("💾 Salvar na Nuvem", key=f"t_{cpf}")
+            st.markdown("---")
+            resps, obss, itens = {}, {}, {}
+            for p_str in pads_nf:
+                st.markdown(f"**{p_str} - {idx_perg.nomes.get(p_str, '')}**")
+                for idx, txt in idx_perg.perguntas(p_str):
+                    k_wd = f"{cpf}_{p_str}_{idx}"
+                    itens[k_wd] = (p_str, idx)
+                    prev = mem.get((p_str, str(txt).strip()))
+                    ir = OPCOES_RESP.index(prev['res']) if prev and prev['res'] in OPCOES_RESP else None
+                    st.write(txt)
+                    resps[k_wd] = st.radio("R", OPCOES_RESP, key=k_wd, horizontal=True, index=ir, label_visibility="collapsed")
+                    obss[k_wd] = st.text_input("Obs (Obrigatório se NC)", value=(prev['obs'] if prev else ""), key=f"o_{k_wd}")
+                    st.markdown("---")
             
-        return df_t, df_p, df_a, True
-    except Exception as e:
-        return pd.DataFrame(), pd.DataFrame(), None, False
-
-def carregar_respostas_nuvem():
-    try:
-        conn = st.connection("gsheets", type=GSheetsConnection)
-        # Lemos tudo (TTL=0 garante que ele pegue o dado que acabamos de salvar)
-        df = conn.read(worksheet="Respostas_DB", ttl=0)
-        
-        if df.empty: return pd.DataFrame()
-
-        # 1. Limpeza de Colunas (Padrão)
-        df.columns = [c.strip() for c in df.columns]
-        for c in ['CPF', 'Padrao', 'Pergunta', 'Data']:
-            if c in df.columns:
-                df[c] = df[c].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-
-        # 2. A MÁGICA (Deduplicação Inteligente)
-        # Remove duplicatas baseadas na chave composta (Quem + Onde + O Que).
-        # 'keep=last' mantém a ÚLTIMA linha encontrada na planilha (a mais recente).
-        if not df.empty and 'CPF' in df.columns and 'Padrao' in df.columns and 'Pergunta' in df.columns:
-            df = df.drop_duplicates(subset=['CPF', 'Padrao', 'Pergunta'], keep='last')
-        
-        return df
-
-    except Exception as e:
-        # st.error(f"Erro silencioso nuvem: {e}") # Comentado para não sujar a tela
-        return pd.DataFrame()
+            alerta_fim = st.empty()
+            s_bot = st.form_submit_button("💾 Salvar na Nuvem", key=f"b_{cpf}")
+            if submit_top or s_bot:
+                dh = obter_hora()
+                novos = []
+                erro_val = False
+                lista_erros = []
+                
+                # --- 1. PARTE QUE MANTIVEMOS (Validação e Memória) ---
+                for k, v in resps.items():
+                    # Verifica se é NC sem observação
+                    if v == "Não Conforme" and not obss.get(k, "").strip():
+                        erro_val = True
+                        pad_e, idx_e = itens[k]
+                        lista_erros.append(f"**PADRÃO {pad_e}:** {idx_perg.texto.get(idx_e, 'Item sem observação')}")
+                    
+                    if v:
+                        pr, ir = itens[k]
+                        pt = idx_perg.texto.get(ir, "Erro")
+                        
+                        reg = {"Data":dh, "Filial":fil, "Funcionario":nome, "CPF":cpf, "Padrao":pr, "Pergunta":pt, "Resultado":v, "Observacao":obss.get(k,"")}
+                        if st.session_state['auditor_logado']: reg.update({"Auditor_Nome":st.session_state['auditor_logado']['Nome'], "Auditor_CPF":st.session_state['auditor_logado']['CPF']})
+                        
+                        novos.append(reg)
+                
+                # Mesmo conteúdo do último envio desta pessoa, que ainda é o que vale
+                # (duplo clique, os dois botões, tentar de novo): nada a gravar
+                assinatura = tuple(sorted((r['Padrao'], r['Pergunta'], r['Resultado'], r['Observacao']) for r in novos))
+                ultimo = st.session_state['submissoes'].get(cpf)
+                repetido = ultimo is not None and ultimo[0] == assinatura and respostas.envio_vigente(ultimo[1], novos)
+
+                # Exibe erros se houver
+                if erro_val:
+                    msg_erro = "⛔ **ERRO: PREENCHIMENTO OBRIGATÓRIO!**\n\nVocê marcou 'Não Conforme' nos itens abaixo sem justificativa:\n\n" + "\n".join([f"- {e}" for e in lista_erros])
+                    alerta_topo.error(msg_erro)
+                    alerta_fim.error(msg_erro)
+                
+                # --- 2. PARTE QUE MUDAMOS (O Salvamento Seguro - Append) ---
+                elif novos and repetido:
+                    st.toast(f"ℹ️ {nome}: estas respostas já foram enviadas")
+                elif novos:
+                    try:
+                        # Cada envio leva um id (a fila ignora o mesmo id duas vezes) e um
+                        # carimbo crescente, que decide a resposta válida na leitura
+                        id_envio, carimbo = uuid.uuid4().hex, novo_carimbo()
+                        valores_para_adicionar = []
+                        for item in novos:
+                            item.update({"Submissao_ID": id_envio, "Carimbo": carimbo})
+                            linha = [str(item.get(c, "")) for c in COLUNAS_RESPOSTAS]
+                            valores_para_adicionar.append(linha)
+
+                        # Grava na fila local; a thread de envio sobe para a nuvem em lote
+                        with medir('salvar.local', detalhe=cpf) as m:
+                            m.linhas = len(novos)
+                            obter_fila().enfileirar(valores_para_adicionar, id_envio)
+                            st.session_state['envios'].append({'id': id_envio, 'Hora': dh, 'Funcionario': nome, 'Itens': len(novos)})
+                            st.session_state['submissoes'][cpf] = (assinatura, id_envio)
+                            # Substitui as respostas anteriores na tabela compartilhada (sobe a versão)
+                            respostas.registrar(novos)
+                        
+                        st.toast(f"✅ {nome}: {len(novos)} respostas salvas (enviando para a nuvem)")
+                        # Só esta pessoa é redesenhada (ícone e contadores do cabeçalho)
+                        rerun_fragmento()
+                        
+                    except Exception as e:
+                        DIAG.registrar_erro('salvar.local', e)
+                        st.error(f"❌ Erro ao Salvar: {e}")
+                        backup = pd.DataFrame(novos)
+        # Fora do form (download_button não é permitido dentro dele)
+        if backup is not None:
+            st.download_button("🚨 Baixar Backup Local", gerar_excel(backup), "Backup_Erro.xlsx", key=f"bk_{cpf}")
 
 # --- 4. BARRA LATERAL ---
 st.sidebar.header("1. Conexão")
@@ -103,32 +189,44 @@ if os.path.exists("logo.png"): st.sidebar.image("logo.png", use_container_width=
 else: st.sidebar.write("🏢 DTO 01 - DCS SCANIA")
 
 # Carga Inicial
-df_treinos, df_perguntas, df_auditores, dados_ok = carregar_bases_estaticas()
+bases = carregar_bases_estaticas()
+dados_ok = bases is not None
+if dados_ok:
+    # Colunas já localizadas na carga (esq.cpf, esq.padrao, ...)
+    df_treinos, df_perguntas, df_auditores = bases.treinos, bases.perguntas, bases.auditores
+    esq_tr, esq_pg, esq_au = bases.esq_treinos, bases.esq_perguntas, bases.esq_auditores
+    derivados = derivados_bases(bases.versao, bases)
+else: df_treinos, df_perguntas, df_auditores = pd.DataFrame(), pd.DataFrame(), None
+respostas = obter_respostas()  # tabela única do processo, compartilhada entre as sessões
+obter_fila()  # sobe o que ficou na fila de um reinício e reaplica os envios pendentes nas recargas
 
 if dados_ok:
-    st.sidebar.success("✅ Base Conectada")
-    if not st.session_state['lista_auditores'] and df_auditores is not None:
-        c_nome = achar_coluna(df_auditores, 'nome')
-        if c_nome: st.session_state['lista_auditores'] = df_auditores[c_nome].unique().tolist()
+    snap = obter_snapshot()
+    if snap.online is False:
+        st.sidebar.warning(f"📴 Sheets indisponível. Usando cópia local de {datetime.fromtimestamp(snap.gravado_em, pytz.timezone('America/Sao_Paulo')).strftime('%d/%m/%Y %H:%M')}.")
+    else: st.sidebar.success("✅ Base Conectada")
+    if not st.session_state['lista_auditores'] and df_auditores is not None and esq_au.nome:
+        st.session_state['lista_auditores'] = derivados['auditores'].nomes
     
-    # Sincronia Automática da Nuvem
-    if not st.session_state['resultados']:
-        df_cloud = carregar_respostas_nuvem()
-        if not df_cloud.empty:
-            df_cloud.columns = [c.strip() for c in df_cloud.columns]
-            for c in df_cloud.columns: df_cloud = limpar_texto(df_cloud, c)
-            st.session_state['resultados'] = df_cloud.to_dict('records')
-            st.sidebar.info(f"☁️ {len(st.session_state['resultados'])} registros.")
+    # Sincronia Automática da Nuvem (incremental: só as linhas novas da Respostas_DB)
+    try: respostas.sincronizar()
+    except Exception as e:
+        DIAG.registrar_erro('respostas.sincronizar', e)
+        st.sidebar.warning(f"☁️ Sem sincronia com a nuvem: {e}")
+    if not respostas.carregada:
+        st.sidebar.warning("⏳ Respostas ainda não carregadas: o progresso aparece zerado até a próxima sincronia.")
+    if respostas.base:
+        st.sidebar.info(f"☁️ {len(respostas.base)} registros.")
 else:
     st.sidebar.warning("Tentando reconectar...")
     if st.sidebar.button("Forçar Recarga"): 
-        st.cache_data.clear()
+        obter_snapshot().atualizar()
         st.rerun()
 
 # Login Inteligente
 if dados_ok:
     if df_auditores is not None:
-        col_cpf = achar_coluna(df_auditores, 'cpf')
+        col_cpf = esq_au.cpf
         if col_cpf:
             st.sidebar.markdown("---")
             if st.session_state['auditor_logado']:
@@ -145,38 +243,59 @@ if dados_ok:
                 cpf_in = st.sidebar.text_input("CPF (Apenas números)", type="password")
                 if st.sidebar.button("Entrar"):
                     cpf_clean = cpf_in.replace('.','').replace('-','').strip()
-                    match = df_auditores[df_auditores[col_cpf] == cpf_clean]
+                    # Cadastro indexado por CPF, com as permissões já lidas na carga
+                    aud = derivados['auditores'].obter(cpf_clean)
                     
-                    if not match.empty:
-                        dados = match.iloc[0]
-                        c_nome = achar_coluna(df_auditores, 'nome') or col_cpf
-                        c_perf = achar_coluna(df_auditores, 'perfil')
-                        c_fil = achar_coluna(df_auditores, 'filia')
-                        c_pad = achar_coluna(df_auditores, 'padrao')
-
-                        nome = dados[c_nome]
-                        perfil = str(dados.get(c_perf, 'Auditor')).strip() if c_perf else 'Auditor'
-                        
-                        raw_f = str(dados.get(c_fil, 'Todas')) if c_fil else 'Todas'
-                        if 'todas' in raw_f.lower() or pd.isna(raw_f) or raw_f == 'nan':
-                            fils_perm = 'TODAS'
-                        else:
-                            fils_perm = [x.strip() for x in raw_f.split(',')]
-                            
-                        raw_p = str(dados.get(c_pad, 'Todos')) if c_pad else 'Todos'
-                        if 'todos' in raw_p.lower() or pd.isna(raw_p) or raw_p == 'nan':
-                            pads_perm = 'TODOS'
-                        else:
-                            pads_perm = [x.strip() for x in raw_p.split(',')]
-
-                        st.session_state['auditor_logado'] = {'Nome': nome, 'CPF': cpf_clean}
-                        st.session_state['permissoes'] = {'filiais': fils_perm, 'padroes': pads_perm, 'perfil': perfil}
+                    if aud is not None:
+                        st.session_state['auditor_logado'] = {'Nome': aud.nome, 'CPF': cpf_clean}
+                        st.session_state['permissoes'] = aud.permissoes()
                         st.rerun()
                     else: st.sidebar.error("CPF não encontrado.")
     else:
         st.session_state['auditor_logado'] = {'Nome': 'Geral', 'CPF': '000'}
         st.session_state['permissoes'] = {'filiais': 'TODAS', 'padroes': 'TODOS', 'perfil': 'Gestor'}
 
+# Importação de backup / planilha offline: valida em bloco e manda pela mesma fila
+if dados_ok and st.session_state['auditor_logado']:
+    with st.sidebar.expander("📥 Importar Planilha"):
+        arq = st.file_uploader("Backup ou planilha offline", type=["xlsx", "csv"], key="imp_arq")
+        if arq is not None and st.button("Importar", key="imp_ok"):
+            validador = ValidadorImportacao(derivados['perguntas'], df_treinos, esq_tr, st.session_state['auditor_logado'],
+                                            st.session_state['permissoes'], obter_hora())
+            try:
+                with st.spinner("Importando..."):
+                    res_i = importar(arq, arq.name, validador, respostas.registrar, obter_fila().enfileirar)
+            except ValueError as e:
+                DIAG.registrar_erro('importar', e)
+                st.error(f"❌ {e}")
+            else:
+                ids_sessao = {e['id'] for e in st.session_state['envios']}
+                for id_envio, n_lote in res_i['envios']:
+                    if id_envio not in ids_sessao:
+                        st.session_state['envios'].append({'id': id_envio, 'Hora': obter_hora(), 'Funcionario': f"📥 {arq.name}", 'Itens': n_lote})
+                st.success(f"✅ {res_i['aceitas']} respostas importadas de {res_i['linhas']} linhas.")
+                rej = res_i['rejeitadas']
+                if len(rej):
+                    st.warning(f"⚠️ {len(rej)} linhas rejeitadas.")
+                    st.dataframe(rej[['Linha', 'Motivo']], hide_index=True, use_container_width=True)
+                    st.download_button("📥 Baixar Rejeitadas", gerar_excel(rej), "Importacao_Rejeitadas.xlsx", on_click="ignore")
+
+# Situação dos envios desta sessão (fila local -> nuvem)
+if st.session_state['envios']:
+    env = st.session_state['envios']
+    stt = obter_fila().status([e['id'] for e in env])
+    tab_env = []
+    for e in reversed(env):
+        s_e = stt.get(e['id'], {'status': 'gravado', 'erro': None})
+        if s_e['status'] == 'gravado': icone = "✅ Gravado"
+        elif s_e['erro']: icone = "⚠️ Tentando de novo"
+        else: icone = "⏳ Pendente"
+        tab_env.append({"Hora": e['Hora'], "Funcionario": e['Funcionario'], "Itens": e['Itens'], "Status": icone})
+    n_pend = sum(1 for t in tab_env if t['Status'] != "✅ Gravado")
+    with st.sidebar.expander(f"📤 Envios ({n_pend} pendentes)" if n_pend else "📤 Envios (tudo gravado)"):
+        st.dataframe(pd.DataFrame(tab_env), hide_index=True, use_container_width=True)
+        st.button("🔄 Atualizar", key="atualiza_envios")
+
 st.sidebar.markdown("---")
 pagina = st.sidebar.radio("Menu:", ["📝 EXECUTAR DTO 01", "📊 Painel Gerencial"])
 # ================= EXECUÇÃO =================
@@ -188,191 +307,46 @@ if pagina == "📝 EXECUTAR DTO 01":
         st.title("📝 EXECUTAR DTO 01")
         perms = st.session_state['permissoes']
         st.sidebar.header("Filtros Execução")
+        # Bases e opções já recortadas pelas permissões (compartilhado por quem tem o mesmo recorte)
+        escopo = obter_escopos().obter(bases, perms)
+        df_esc, opts_f, opts_p = escopo.treinos, escopo.filiais, escopo.padroes
         
-        c_fil_tr = achar_coluna(df_treinos, 'filial')
-        todas_f = sorted(df_treinos[c_fil_tr].dropna().unique())
-        if perms['filiais'] == 'TODAS': opts_f = todas_f
-        else: opts_f = sorted([f for f in todas_f if f.strip() in perms['filiais']])
+        c_fil_tr = esq_tr.filial
         sel_fil = st.sidebar.multiselect("Selecione Filiais", opts_f, default=opts_f if len(opts_f)==1 else None)
-        
-        c_pad_pg = achar_coluna(df_perguntas, 'padrao')
-        todas_p = sorted(df_perguntas[c_pad_pg].dropna().unique())
-        if perms['padroes'] == 'TODOS': opts_p = todas_p
-        else: opts_p = sorted([p for p in todas_p if str(p).strip() in perms['padroes']])
             
         modo_busca = st.sidebar.radio("Modo de Busca:", ["Por Padrões", "Por Colaborador"])
         df_m = pd.DataFrame()
         sel_pad = []
 
-        c_pad_tr = achar_coluna(df_treinos, 'padrao')
-        c_nom_tr = achar_coluna(df_treinos, 'nome')
-        c_cpf_tr = achar_coluna(df_treinos, 'cpf')
+        c_pad_tr = esq_tr.padrao
+        c_nom_tr = esq_tr.nome
+        c_cpf_tr = esq_tr.cpf
 
         if modo_busca == "Por Padrões":
             sel_pad = list(opts_p) if st.sidebar.checkbox("Todos Meus Padrões", key="pe") else st.sidebar.multiselect("Padrões", opts_p)
             if sel_fil and sel_pad:
-                df_m = df_treinos[(df_treinos[c_fil_tr].isin(sel_fil)) & (df_treinos[c_pad_tr].isin(sel_pad))]
+                df_m = df_esc[(df_esc[c_fil_tr].isin(sel_fil)) & (df_esc[c_pad_tr].isin(sel_pad))]
         else:
             if sel_fil:
-                pessoas = sorted(df_treinos[df_treinos[c_fil_tr].isin(sel_fil)][c_nom_tr].unique())
+                df_fil = df_esc[df_esc[c_fil_tr].isin(sel_fil)]
+                pessoas = sorted(df_fil[c_nom_tr].unique())
                 sel_pessoa = st.sidebar.selectbox("Selecione o Colaborador", pessoas)
                 if sel_pessoa:
-                    df_pessoa = df_treinos[(df_treinos[c_fil_tr].isin(sel_fil)) & (df_treinos[c_nom_tr]==sel_pessoa)]
-                    if perms['padroes'] != 'TODOS':
-                        df_pessoa = df_pessoa[df_pessoa[c_pad_tr].isin(perms['padroes'])]
-                    df_m = df_pessoa
+                    df_m = df_fil[df_fil[c_nom_tr]==sel_pessoa]
                     sel_pad = df_m[c_pad_tr].unique().tolist()
 
         if not df_m.empty:
-            mapa_nomes = {}
-            c_nom_pg = achar_coluna(df_perguntas, 'nome')
-            if c_nom_pg:
-                tn = df_perguntas[[c_pad_pg, c_nom_pg]].drop_duplicates()
-                mapa_nomes = pd.Series(tn[c_nom_pg].values, index=tn[c_pad_pg].astype(str).str.strip()).to_dict()
-            
-            dict_metas = df_perguntas.groupby(c_pad_pg).size().to_dict()
-
-            rank = df_m.groupby([c_cpf_tr,c_nom_tr,c_fil_tr]).size().reset_index(name='Qtd')
+            rank = df_m.groupby([c_cpf_tr,c_nom_tr,c_fil_tr], observed=True).size().reset_index(name='Qtd')
             if modo_busca == "Por Padrões":
                 rank = rank.sort_values(by=['Qtd',c_fil_tr], ascending=[False,True])
             
-            if 'pagina_atual' not in st.session_state: st.session_state['pagina_atual'] = 0
-            tot_p = (len(rank)-1)//10 + 1
-            c1,c2,c3 = st.columns([1,3,1])
-            if c1.button("⬅️") and st.session_state['pagina_atual']>0: st.session_state['pagina_atual']-=1; st.rerun()
-            if c3.button("➡️") and st.session_state['pagina_atual']<tot_p-1: st.session_state['pagina_atual']+=1; st.rerun()
-            c2.markdown(f"<div style='text-align:center'>Pág {st.session_state['pagina_atual']+1}/{tot_p}</div>", unsafe_allow_html=True)
-            
-            pg_rank = rank.iloc[st.session_state['pagina_atual']*10 : (st.session_state['pagina_atual']+1)*10]
-            
-            mem = {}
-            for r in st.session_state['resultados']:
-                c_r = str(r.get('CPF', r.get('cpf', ''))).strip()
-                p_r = str(r.get('Padrao', r.get('padrao', ''))).strip()
-                t_r = str(r.get('Pergunta', r.get('pergunta', ''))).strip()
-                mem[f"{c_r}_{p_r}_{t_r}"] = {'res':r.get('Resultado'),'obs':r.get('Observacao')}
-            
-            for _, row in pg_rank.iterrows():
-                cpf, nome, fil = str(row[c_cpf_tr]).strip(), row[c_nom_tr], row[c_fil_tr]
-                qtd_pads = row['Qtd']
-                
-                pads_nf = df_m[df_m[c_cpf_tr].astype(str).str.strip() == cpf][c_pad_tr].unique()
-                pads_nf = [str(p).strip() for p in pads_nf]
-                meta_total = sum(dict_metas.get(p,0) for p in pads_nf)
-                
-                resp_tot = 0
-                for r in st.session_state['resultados']:
-                    if str(r.get('CPF','')).strip() == cpf and str(r.get('Padrao','')).strip() in pads_nf: resp_tot += 1
-                
-                if resp_tot == 0: icon = "⚪"
-                elif resp_tot >= meta_total and meta_total > 0: icon = "🟢"
-                else: icon = "🟡"
-                
-                abrir_auto = True if modo_busca == "Por Colaborador" else False
-                
-                with st.expander(f"{icon} {nome} | {fil} ({qtd_pads} Padrões | {resp_tot}/{meta_total})", expanded=abrir_auto):
-                    with st.form(key=f"f_{cpf}"):
-                        alerta_topo = st.empty()
-                        c_top, _ = st.columns([1, 4])
-                        submit_top = c_top.form_submit_button("💾 Salvar na Nuvem", key=f"t_{cpf}")
-                        st.markdown("---")
-                        resps, obss = {}, {}
-                        pads_orig = df_m[df_m[c_cpf_tr].astype(str).str.strip() == cpf][c_pad_tr].unique()
-                        for p in pads_orig:
-                            p_str = str(p).strip()
-                            st.markdown(f"**{p_str} - {mapa_nomes.get(p_str, '')}**")
-                            pergs = df_perguntas[df_perguntas[c_pad_pg].astype(str).str.strip() == p_str]
-                            for idx, pr in pergs.iterrows():
-                                c_perg = achar_coluna(df_perguntas, 'pergunta')
-                                txt, k_wd = pr[c_perg], f"{cpf}_{p_str}_{idx}"
-                                prev = mem.get(f"{cpf}_{p_str}_{txt}")
-                                ir = ["Conforme","Não Conforme","Não se Aplica"].index(prev['res']) if prev and prev['res'] in ["Conforme","Não Conforme","Não se Aplica"] else None
-                                st.write(txt)
-                                resps[k_wd] = st.radio("R", ["Conforme", "Não Conforme", "Não se Aplica"], key=k_wd, horizontal=True, index=ir, label_visibility="collapsed")
-                                obss[k_wd] = st.text_input("Obs (Obrigatório se NC)", value=(prev['obs'] if prev else ""), key=f"o_{k_wd}")
-                                st.markdown("---")
-                        
-                        alerta_fim = st.empty()
-                        s_bot = st.form_submit_button("💾 Salvar na Nuvem", key=f"b_{cpf}")
-                        if submit_top or s_bot:
-                            dh = obter_hora()
-                            novos = []
-                            erro_val = False
-                            lista_erros = []
-                            
-                            # --- 1. PARTE QUE MANTIVEMOS (Validação e Memória) ---
-                            for k, v in resps.items():
-                                # Verifica se é NC sem observação
-                                if v == "Não Conforme" and not obss.get(k, "").strip():
-                                    erro_val = True
-                                    try:
-                                        idx_e = int(k.rsplit('_', 1)[-1])
-                                        c_pg_err = achar_coluna(df_perguntas, 'pergunta')
-                                        txt_e = df_perguntas.loc[idx_e, c_pg_err]
-                                        pad_e = k.split('_')[1]
-                                        lista_erros.append(f"**PADRÃO {pad_e}:** {txt_e}")
-                                    except: lista_erros.append("Item sem observação")
-                                
-                                if v:
-                                    _, pr, ir = k.split('_', 2)
-                                    c_pg = achar_coluna(df_perguntas, 'pergunta')
-                                    try: pt = df_perguntas.loc[int(ir), c_pg]
-                                    except: pt = "Erro"
-                                    
-                                    # Limpa resposta anterior da memória local
-                                    st.session_state['resultados'] = [r for r in st.session_state['resultados'] if not (str(r.get('CPF','')).strip()==cpf and str(r.get('Padrao','')).strip()==str(pr).strip() and str(r.get('Pergunta','')).strip()==pt)]
-                                    
-                                    reg = {"Data":dh, "Filial":fil, "Funcionario":nome, "CPF":cpf, "Padrao":str(pr).strip(), "Pergunta":pt, "Resultado":v, "Observacao":obss.get(k,"")}
-                                    if st.session_state['auditor_logado']: reg.update({"Auditor_Nome":st.session_state['auditor_logado']['Nome'], "Auditor_CPF":st.session_state['auditor_logado']['CPF']})
-                                    
-                                    st.session_state['resultados'].append(reg)
-                                    novos.append(reg)
-                            
-                            # Exibe erros se houver
-                            if erro_val:
-                                msg_erro = "⛔ **ERRO: PREENCHIMENTO OBRIGATÓRIO!**\n\nVocê marcou 'Não Conforme' nos itens abaixo sem justificativa:\n\n" + "\n".join([f"- {e}" for e in lista_erros])
-                                alerta_topo.error(msg_erro)
-                                alerta_fim.error(msg_erro)
-                            
-                            # --- 2. PARTE QUE MUDAMOS (O Salvamento Seguro - Append) ---
-                            elif novos:
-                                try:
-                                    # Preparar dados para o formato de lista
-                                    colunas_ordem = ["Data", "Filial", "Funcionario", "CPF", "Padrao", "Pergunta", "Resultado", "Observacao", "Auditor_Nome", "Auditor_CPF"]
-                                    
-                                    valores_para_adicionar = []
-                                    for item in novos:
-                                        linha = [str(item.get(c, "")) for c in colunas_ordem]
-                                        valores_para_adicionar.append(linha)
-
-                                    # Conexão Direta usando gspread (Mais Rápido e Seguro)
-                                    creds = st.secrets["connections"]["gsheets"]
-                                    gc = gspread.service_account_from_dict(creds)
-                                    
-                                    # Abrir planilha pela URL
-                                    sh = gc.open_by_url(creds["spreadsheet"])
-                                    wks = sh.worksheet("Respostas_DB")
-                                    
-                                    # Mágica: Adicionar ao final (Append)
-                                    wks.append_rows(valores_para_adicionar, value_input_option="USER_ENTERED")
-                                    
-                                    # Atualiza memória local
-                                    st.session_state['resultados'].extend(novos)
-                                    
-                                    st.success(f"✅ Salvo com Sucesso! ({len(novos)} atualizações)")
-                                    
-                                    import time
-                                    time.sleep(1)
-                                    st.rerun()
-                                    
-                                except Exception as e:
-                                    st.error(f"❌ Erro ao Salvar: {e}")
-                                    df_bck = pd.DataFrame(novos)
-                                    st.download_button("🚨 Baixar Backup Local", gerar_excel(df_bck), "Backup_Erro.xlsx")
+            base_resp = respostas.visao(perms)
+            abrir_auto = True if modo_busca == "Por Colaborador" else False
+            lista_execucao(rank, c_cpf_tr, c_nom_tr, c_fil_tr, padroes_por_cpf(df_m, esq_tr), abrir_auto, base_resp, derivados)
             st.markdown("---")
-            if st.session_state['resultados']:
+            if len(base_resp):
                 st.subheader("📋 Resumo Sessão")
-                st.dataframe(pd.DataFrame(st.session_state['resultados']), use_container_width=True)
+                st.dataframe(base_resp.to_df(), use_container_width=True)
         else: st.info("Selecione filtros.")
             # ================= PAINEL =================
 elif pagina == "📊 Painel Gerencial":
@@ -383,11 +357,10 @@ elif pagina == "📊 Painel Gerencial":
         perms = st.session_state['permissoes']
         
         # --- DEFINIÇÃO DE COLUNAS (CORRIGIDO) ---
-        c_fil_tr = achar_coluna(df_treinos, 'filial')
-        c_pad_tr = achar_coluna(df_treinos, 'padrao') # <--- ESTA LINHA FALTAVA
-        c_cpf_tr = achar_coluna(df_treinos, 'cpf')
-        c_nom_tr = achar_coluna(df_treinos, 'nome')
-        c_pad_pg = achar_coluna(df_perguntas, 'padrao')
+        c_fil_tr = esq_tr.filial
+        c_pad_tr = esq_tr.padrao
+        c_cpf_tr = esq_tr.cpf
+        c_nom_tr = esq_tr.nome
 
         with st.expander("🔍 Raio-X", expanded=False):
             colisao = df_treinos.groupby(c_cpf_tr)[c_nom_tr].nunique()
@@ -397,78 +370,58 @@ elif pagina == "📊 Painel Gerencial":
 
         st.sidebar.header("Filtros Dashboard")
         
-        # Filtros Dinâmicos
-        todas_f = sorted(df_treinos[c_fil_tr].dropna().unique())
-        if perms['filiais'] == 'TODAS': opts_f = todas_f
-        else: opts_f = sorted([f for f in todas_f if f.strip() in perms['filiais']])
+        # Filtros Dinâmicos (opções do recorte das permissões)
+        escopo = obter_escopos().obter(bases, perms)
+        opts_f, opts_p = escopo.filiais, escopo.padroes
         f_sel = st.sidebar.multiselect("Filiais", opts_f, default=opts_f)
-        
-        todas_p = sorted(df_perguntas[c_pad_pg].dropna().unique())
-        if perms['padroes'] == 'TODOS': opts_p = todas_p
-        else: opts_p = sorted([p for p in todas_p if str(p).strip() in perms['padroes']])
         p_sel = st.sidebar.multiselect("Padrões", opts_p, default=opts_p)
         
         st.markdown("---")
         
-        # Agora c_pad_tr existe para fazer o filtro
-        df_esc = df_treinos[(df_treinos[c_fil_tr].isin(f_sel)) & (df_treinos[c_pad_tr].isin(p_sel))]
-        
-        df_res = pd.DataFrame(st.session_state['resultados'])
-        df_rf = pd.DataFrame()
-        
-        # Mapeia colunas do resultado
-        c_fil_rs = None
-        c_pad_rs = None
-        c_cpf_rs = None
-        
-        if not df_res.empty:
-            c_fil_rs = achar_coluna(df_res, 'filial')
-            c_pad_rs = achar_coluna(df_res, 'padrao')
-            c_cpf_rs = achar_coluna(df_res, 'cpf')
-            c_aud_nm = achar_coluna(df_res, 'auditor_nome')
-            
-            if c_fil_rs and c_pad_rs:
-                df_rf = df_res[(df_res[c_fil_rs].isin(f_sel)) & (df_res[c_pad_rs].isin(p_sel))]
-        
-        metas = df_perguntas.groupby(c_pad_pg).size().to_dict()
+        # Recorte do cubo de progresso (treinamentos x respostas) pelos filtros.
+        # As opções já estão dentro das permissões, então o recorte também.
+        with medir('painel.fatia'), respostas.lock: fatia = derivados['cubo'].fatia(f_sel, p_sel, respostas.contagem)
+        visao_resp = respostas.visao(perms)
+        # Exportações: geradas só no clique, guardadas por versão dos dados + filtro
+        exportacoes = obter_exportacoes()
+        ver_dados = (bases.versao, visao_resp.versao)
+        filtro = (tuple(f_sel), tuple(p_sel))
+        tbl_perf = None
 
         # PERFORMANCE AUDITOR (GESTOR)
         if perms.get('perfil') == 'Gestor' and df_auditores is not None:
             st.subheader("🏆 Performance Operacional")
             try:
-                tbl_perf = []
                 l_auds = st.session_state.get('lista_auditores', [])
-                if not l_auds:
-                     cn = achar_coluna(df_auditores, 'nome')
-                     if cn: l_auds = df_auditores[cn].unique().tolist()
-
-                for nm in l_auds:
-                    da = pd.Series()
-                    cn = achar_coluna(df_auditores, 'nome')
-                    if cn:
-                        m = df_auditores[df_auditores[cn] == nm]
-                        if not m.empty: da = m.iloc[0]
-                    pa = achar_coluna(df_auditores, 'perfil')
-                    if pa and 'gestor' in str(da.get(pa, '')).lower(): continue
-
-                    cf, cp = achar_coluna(df_auditores, 'filiais'), achar_coluna(df_auditores, 'padroes')
-                    rf = str(da.get(cf, 'Todas')) if cf else 'Todas'
-                    lf = list(df_treinos[c_fil_tr].unique()) if 'todas' in rf.lower() else [x.strip() for x in rf.split(',')]
-                    rp = str(da.get(cp, 'Todos')) if cp else 'Todos'
-                    lp = list(df_perguntas[c_pad_pg].unique()) if 'todos' in rp.lower() else [x.strip() for x in rp.split(',')]
-                    
-                    df_uni = df_treinos[(df_treinos[c_fil_tr].isin(lf)) & (df_treinos[c_pad_tr].isin(lp))]
-                    meta_aud = sum(metas.get(str(r[c_pad_tr]),0) for _, r in df_uni.iterrows())
-                    
-                    r_aud = 0
-                    if not df_rf.empty and c_aud_nm:
-                        r_aud = len(df_rf[df_rf[c_aud_nm] == nm])
-                    
-                    pend = max(0, meta_aud - r_aud)
-                    pct = int((r_aud/meta_aud)*100) if meta_aud > 0 else 0
-                    tbl_perf.append({"Auditor": nm, "Meta": meta_aud, "Real": r_aud, "Pend": pend, "%": f"{pct}%"})
-                st.dataframe(pd.DataFrame(tbl_perf).sort_values(by="Real", ascending=False), use_container_width=True)
-            except: pass
+                if not l_auds and esq_au.nome: l_auds = derivados['auditores'].nomes
+                with medir('painel.performance'):
+                    tbl_perf = performance_auditores(l_auds, derivados['metas_auditores'], fatia.por_auditor)
+                st.dataframe(tbl_perf, use_container_width=True)
+            except Exception as e:
+                DIAG.registrar_erro('painel.performance', e)
+                st.error(f"❌ Erro na tabela de performance: {e}")
+            if st.button("🗜️ Compactar Respostas", help="Consolida a Respostas_DB no snapshot e arquiva as linhas substituídas"):
+                try:
+                    with st.spinner("Compactando..."): res_c = obter_armazenamento().compactar()
+                    respostas.sincronizar(forcar=True)
+                    st.success(f"✅ {res_c['log']} linhas do log consolidadas: {res_c['snapshot']} respostas no snapshot, "
+                               f"{res_c['arquivadas']} arquivadas.")
+                except Exception as e:
+                    DIAG.registrar_erro('compactar', e)
+                    st.error(f"❌ Erro ao compactar: {e}")
+
+            # Tempos por etapa deste processo (só é montado com o painel aberto)
+            diag = st.expander("⏱ Diagnóstico", key="diag", on_change="rerun")
+            if diag.open:
+                with diag:
+                    st.dataframe(DIAG.resumo(), use_container_width=True, hide_index=True)
+                    st.caption(f"{len(DIAG)} medições guardadas (máx. {DIAG.maximo}) neste servidor.")
+                    d1, d2, d3 = st.columns(3)
+                    d1.download_button("📥 CSV", DIAG.para_csv, "diagnostico.csv", on_click="ignore")
+                    d2.download_button("📥 JSON", DIAG.para_json, "diagnostico.json", on_click="ignore")
+                    if d3.button("🧹 Limpar"):
+                        DIAG.limpar()
+                        st.rerun()
             st.markdown("---")
 
         st.write("Visualização:")
@@ -476,22 +429,8 @@ elif pagina == "📊 Painel Gerencial":
         st.markdown("---")
 
         if visao == "👥 Por Pessoa":
-            total = df_esc[c_cpf_tr].nunique()
-            counts = {'P':0, 'A':0, 'C':0}
-            data_list = []
-            resps = {}
-            if not df_rf.empty and c_cpf_rs: resps = df_rf.groupby(c_cpf_rs).size().to_dict()
-            
-            for cpf in df_esc[c_cpf_tr].unique():
-                pads = df_esc[df_esc[c_cpf_tr]==cpf][c_pad_tr].unique()
-                meta = sum(metas.get(p,0) for p in pads)
-                real = resps.get(cpf, 0)
-                if real == 0: stt="🔴 Pendente"; counts['P']+=1
-                elif real >= meta and meta>0: stt="🟢 Concluído"; counts['C']+=1
-                else: stt="🟡 Parcial"; counts['A']+=1
-                info = df_esc[df_esc[c_cpf_tr]==cpf].iloc[0]
-                pct = int((real/meta)*100) if meta>0 else 0
-                data_list.append({"Filial":info[c_fil_tr], "Nome":info[c_nom_tr], "Status":stt, "Prog":f"{real}/{meta} ({pct}%)"})
+            total = fatia.tabela['cpf'].nunique()
+            with medir('painel.status'): df_d, counts = status_por_pessoa(fatia)
             c1,c2,c3,c4 = st.columns(4)
             c1.metric("Pessoas", total)
             c2.metric("Concluídos", counts['C'])
@@ -499,44 +438,17 @@ elif pagina == "📊 Painel Gerencial":
             c4.metric("Pendentes", counts['P'])
             prog = counts['C']/total if total else 0
             st.progress(prog, f"Taxa: {int(prog*100)}%")
-            df_d = pd.DataFrame(data_list)
             if not df_d.empty:
                 t1,t2,t3 = st.tabs(["🔴 Pendentes","🟡 Parciais","🟢 Concluídos"])
                 with t1: st.dataframe(df_d[df_d['Status'].str.contains("Pendente")], use_container_width=True)
                 with t2: st.dataframe(df_d[df_d['Status'].str.contains("Parcial")], use_container_width=True)
                 with t3: st.dataframe(df_d[df_d['Status'].str.contains("Concluído")], use_container_width=True)
-                st.download_button("📥 Baixar Status", gerar_excel(df_d), "Status_Pessoas.xlsx")
+                st.download_button("📥 Baixar Status", exportacoes.adiado(('status', ver_dados, filtro), lambda: [("Status", df_d)]),
+                                   "Status_Pessoas.xlsx", on_click="ignore")
 
         else:
-            total_vol = len(df_esc) 
-            counts_v = {'Z':0, 'I':0, 'C':0}
-            vol_data = []
-            mapa_nomes = {}
-            c_nom_pg = achar_coluna(df_perguntas, 'nome')
-            if c_nom_pg:
-                tn = df_perguntas[[c_pad_pg, c_nom_pg]].drop_duplicates()
-                mapa_nomes = pd.Series(tn[c_nom_pg].values, index=tn[c_pad_pg].astype(str).str.strip()).to_dict()
-            r_det = {}
-            if not df_rf.empty and c_cpf_rs and c_pad_rs: r_det = df_rf.groupby([c_cpf_rs, c_pad_rs]).size().to_dict()
-            
-            for _, r in df_esc.iterrows():
-                c, p = r[c_cpf_tr], r[c_pad_tr]
-                m = metas.get(p,0)
-                rv = r_det.get((c,p), 0)
-                if rv == 0: counts_v['Z']+=1
-                elif rv >= m and m>0: counts_v['C']+=1
-                else: counts_v['I']+=1
-            
-            for p in df_esc[c_pad_tr].unique():
-                sub = df_esc[df_esc[c_pad_tr]==p]
-                qm = len(sub)
-                qok = 0
-                for c in sub[c_cpf_tr]:
-                    m = metas.get(p,0)
-                    if r_det.get((c,p),0) >= m and m>0: qok+=1
-                n_p = mapa_nomes.get(p,p)
-                pct = int((qok/qm)*100) if qm>0 else 0
-                vol_data.append({"Padrão":p, "Desc":n_p, "Vol":qm, "Ok":qok, "%":f"{pct}%"})
+            total_vol = int(fatia.tabela['linhas'].sum())
+            with medir('painel.volumetria'): df_v, counts_v = volumetria_por_padrao(fatia, derivados['perguntas'].nomes)
             c1,c2,c3,c4 = st.columns(4)
             c1.metric("Volume Total", total_vol)
             c2.metric("Concluídas", counts_v['C'])
@@ -544,13 +456,24 @@ elif pagina == "📊 Painel Gerencial":
             c4.metric("Zero", counts_v['Z'])
             prog_v = counts_v['C']/total_vol if total_vol else 0
             st.progress(prog_v, f"Cobertura: {int(prog_v*100)}%")
-            df_v = pd.DataFrame(vol_data)
             st.dataframe(df_v, use_container_width=True)
-            if not df_v.empty: st.download_button("📥 Baixar Volumetria", gerar_excel(df_v), "Status_Volume.xlsx")
+            if not df_v.empty:
+                st.download_button("📥 Baixar Volumetria", exportacoes.adiado(('volume', ver_dados, filtro), lambda: [("Volumetria", df_v)]),
+                                   "Status_Volume.xlsx", on_click="ignore")
 
         st.markdown("---")
         b1,b2 = st.columns([3,1])
-        if not df_res.empty:
-            out = BytesIO()
-            with pd.ExcelWriter(out, engine='xlsxwriter') as writer: df_res.to_excel(writer, index=False)
-            b1.download_button("📥 Baixar Master", out.getvalue(), f"Master_{obter_hora().replace('/','-')}.xlsx")
+        # O DataFrame das respostas só é montado no clique
+        if not visao_resp.vazia():
+            b1.download_button("📥 Baixar Master", exportacoes.adiado(('master', ver_dados, visao_resp.chave), lambda: [("Master", visao_resp.to_df())]),
+                               f"Master_{obter_hora().replace('/','-')}.xlsx", on_click="ignore")
+
+        # Relatório completo: as quatro visões num arquivo só, montadas no clique
+        def relatorio_completo():
+            abas = [("Master", visao_resp.to_df()), ("Status", status_por_pessoa(fatia)[0]),
+                    ("Volumetria", volumetria_por_padrao(fatia, derivados['perguntas'].nomes)[0])]
+            if tbl_perf is not None: abas.append(("Performance", tbl_perf))
+            return abas
+        b2.download_button("📦 Relatório Completo", exportacoes.adiado(('completo', ver_dados, visao_resp.chave, filtro, tbl_perf is not None),
+                                                                      relatorio_completo),
+                           f"Relatorio_{obter_hora().replace('/','-')}.xlsx", on_click="ignore")
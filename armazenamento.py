@@ -0,0 +1,217 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import gspread
+import pandas as pd
+import streamlit as st
+
+from compactacao import compactar_sheets
+from conexao import obter_pool
+from esquema import COLUNAS_RESPOSTAS, linhas_como_texto
+from sincronia import ABA_RESPOSTAS, SincroniaRespostas, normalizar_linhas
+
+# --- ARMAZENAMENTO PLUGÁVEL ---
+# O app conversa com o armazenamento por três operações: ler_bases() devolve as
+# três bases estáticas, sincronia() devolve o leitor incremental das respostas
+# (vencida/buscar) e gravar(linhas) grava respostas. compactar() é a manutenção
+# (ver compactacao.py). O backend sai do secrets:
+#
+#   [armazenamento]
+#   tipo = "sqlite"            # "sheets" (padrão) ou "sqlite"
+#   caminho = "auditoria.db"   # só sqlite; relativo à pasta do app
+#
+# O SQLite serve de substituto offline do Sheets (testes, carga, contingência).
+ABAS_BASES = ["Base_Treinamentos", "Padroes_Perguntas", "Cadastro_Auditores"]
+INTERVALO_SINC_LOCAL = 5  # s entre sincronias com o SQLite (leitura local é barata)
+
+
+def _para_df(valores):
+    if not valores: return pd.DataFrame()
+    cab = [str(c).strip() for c in valores[0]]
+    df = pd.DataFrame([l + [''] * (len(cab) - len(l)) for l in valores[1:]], columns=cab)
+    df = df.loc[:, [c != '' for c in df.columns]]
+    return df.replace('', float('nan')).dropna(how='all')
+
+
+def ler_bases_sheets(pool):
+    dfs = []
+    for nome in ABAS_BASES:
+        try: valores = pool.ler('ler_base', nome, lambda w: w.get_values())
+        except gspread.exceptions.WorksheetNotFound:
+            if nome != "Cadastro_Auditores": raise
+            valores = None
+        dfs.append(None if valores is None else _para_df(valores))
+    return tuple(dfs)
+
+
+class ArmazenamentoSheets:
+    tipo = "sheets"
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._cabecalho_ok = False
+
+    def ler_bases(self):
+        return ler_bases_sheets(self.pool)
+
+    def sincronia(self):
+        return SincroniaRespostas(self.pool)
+
+    # Append puro: a deduplicação por (CPF, Padrao, Pergunta) fica na leitura
+    def gravar(self, linhas):
+        if not self._cabecalho_ok: self._garantir_cabecalho()
+        return self.pool.append_rows(ABA_RESPOSTAS, linhas_como_texto(linhas, COLUNAS_RESPOSTAS))
+
+    # Planilhas de antes do Submissao_ID/Carimbo: completa o cabeçalho (só acrescenta
+    # no fim; um cabeçalho diferente do esperado fica como está). Uma chamada (e um
+    # token do balde) por executar; col_count vem dos metadados já lidos da aba.
+    def _garantir_cabecalho(self):
+        n = len(COLUNAS_RESPOSTAS)
+        cab = [str(c).strip() for c in self.pool.executar('cabecalho', ABA_RESPOSTAS, lambda w: w.row_values(1))]
+        while cab and not cab[-1]: cab.pop()
+        if cab == COLUNAS_RESPOSTAS[:len(cab)] and len(cab) < n:
+            if self.pool.aba(ABA_RESPOSTAS).col_count < n:
+                self.pool.executar('add_cols', ABA_RESPOSTAS, lambda w: w.add_cols(n - w.col_count))
+            self.pool.executar('gravar_cabecalho', ABA_RESPOSTAS, lambda w: w.update(values=[COLUNAS_RESPOSTAS], range_name='A1'))
+        self._cabecalho_ok = True
+
+    def compactar(self):
+        return compactar_sheets(self.pool)
+
+
+# --- SQLITE ---
+# Bases em tabelas com o nome das abas; respostas numa tabela com chave única
+# (CPF, Padrao, Pergunta) e upsert de verdade (um envio repetido ou atrasado, com
+# Carimbo mais velho, não passa por cima do mais novo). seq sobe a cada gravação da linha,
+# e é por ele que a sincronia busca só o que mudou.
+def _ident(nome):
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+class ArmazenamentoSQLite:
+    tipo = "sqlite"
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("PRAGMA busy_timeout=5000")
+        cols = ", ".join(f"{_ident(c)} TEXT NOT NULL DEFAULT ''" for c in COLUNAS_RESPOSTAS)
+        self._con.execute(f"CREATE TABLE IF NOT EXISTS respostas ({cols}, seq INTEGER NOT NULL)")
+        existentes = {r[1] for r in self._con.execute("PRAGMA table_info(respostas)")}
+        for c in COLUNAS_RESPOSTAS:
+            if c not in existentes: self._con.execute(f"ALTER TABLE respostas ADD COLUMN {_ident(c)} TEXT NOT NULL DEFAULT ''")
+        self._con.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_respostas_chave ON respostas (CPF, Padrao, Pergunta)")
+        self._con.execute("CREATE INDEX IF NOT EXISTS ix_respostas_seq ON respostas (seq)")
+
+    def _sql(self, sql, params=()):
+        with self._lock:
+            return self._con.execute(sql, params).fetchall()
+
+    def ler_bases(self):
+        with self._lock:
+            existentes = {n for (n,) in self._con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            dfs = []
+            for nome in ABAS_BASES:
+                if nome not in existentes:
+                    if nome != "Cadastro_Auditores": raise LookupError(f"Tabela {nome} ausente em {self.caminho}")
+                    dfs.append(None); continue
+                df = pd.read_sql_query(f"SELECT * FROM {_ident(nome)}", self._con)
+                dfs.append(df.replace('', float('nan')).dropna(how='all'))
+        return tuple(dfs)
+
+    # Substitui as bases estáticas (carga inicial ou réplica do Sheets)
+    def importar_bases(self, dfs):
+        with self._lock:
+            for nome, df in zip(ABAS_BASES, dfs):
+                if df is None: continue
+                df.astype(str).replace('nan', '').to_sql(nome, self._con, if_exists='replace', index=False)
+
+    def sincronia(self):
+        return SincroniaSQLite(self)
+
+    def gravar(self, linhas):
+        n = len(COLUNAS_RESPOSTAS)
+        nomes = ", ".join(_ident(c) for c in COLUNAS_RESPOSTAS)
+        sets = ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in COLUNAS_RESPOSTAS if c not in ('CPF', 'Padrao', 'Pergunta'))
+        sql = (f"INSERT INTO respostas ({nomes}, seq) VALUES ({', '.join('?' * n)}, ?) "
+               f"ON CONFLICT (CPF, Padrao, Pergunta) DO UPDATE SET {sets}, seq = excluded.seq "
+               "WHERE CAST(excluded.Carimbo AS INTEGER) >= CAST(respostas.Carimbo AS INTEGER)")
+        with self._lock:
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._con.execute("SELECT COALESCE(MAX(seq), 0) FROM respostas").fetchone()[0]
+                params = []
+                for l in linhas:
+                    seq += 1
+                    vals = [str(v).strip() for v in list(l)[:n]]
+                    params.append(vals + [''] * (n - len(vals)) + [seq])
+                self._con.executemany(sql, params)
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return len(linhas)
+
+    # O upsert não deixa linha morta; só devolve o WAL ao arquivo principal
+    def compactar(self):
+        with self._lock:
+            self._con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            n = self._con.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        return {'log': 0, 'snapshot': n, 'arquivadas': 0, 'particoes': {}}
+
+    def ler_respostas(self, desde=0):
+        with self._lock:
+            return self._con.execute(f"SELECT {', '.join(_ident(c) for c in COLUNAS_RESPOSTAS)}, seq FROM respostas "
+                                     "WHERE seq > ? ORDER BY seq", (desde,)).fetchall()
+
+
+# Mesmo contrato da SincroniaRespostas: buscar() -> (registros, completo)
+class SincroniaSQLite:
+    def __init__(self, arm):
+        self._arm = arm
+        self.ultimo_seq = None
+        self.quando = 0.0
+
+    def vencida(self):
+        return time.time() - self.quando > INTERVALO_SINC_LOCAL
+
+    def buscar(self):
+        self.quando = time.time()
+        completo = self.ultimo_seq is None
+        if not completo and self._arm._sql("SELECT COALESCE(MAX(seq), 0) FROM respostas")[0][0] < self.ultimo_seq:
+            completo = True   # tabela refeita por fora: relê tudo
+        linhas = self._arm.ler_respostas(0 if completo else self.ultimo_seq)
+        if linhas: self.ultimo_seq = linhas[-1][-1]
+        elif completo: self.ultimo_seq = 0
+        return normalizar_linhas([list(l[:-1]) for l in linhas], COLUNAS_RESPOSTAS), completo
+
+
+def criar_armazenamento(cfg):
+    tipo = str(cfg.get("tipo", "sheets")).strip().lower()
+    if tipo == "sheets": return ArmazenamentoSheets(obter_pool())
+    if tipo == "sqlite":
+        caminho = cfg.get("caminho", "auditoria.db")
+        if not os.path.isabs(caminho): caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), caminho)
+        return ArmazenamentoSQLite(caminho)
+    raise ValueError(f"Armazenamento desconhecido: {tipo!r} (use 'sheets' ou 'sqlite')")
+
+
+@st.cache_resource(show_spinner=False)
+def obter_armazenamento():
+    return criar_armazenamento(st.secrets.get("armazenamento", {}))
+
+
+# Carga inicial do SQLite a partir de uma planilha com as três abas:
+#   python armazenamento.py importar bases.xlsx auditoria.db
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "importar":
+        sys.exit("uso: python armazenamento.py importar <planilha.xlsx> <banco.db>")
+    abas = pd.read_excel(sys.argv[2], sheet_name=None, dtype=str)
+    ArmazenamentoSQLite(sys.argv[3]).importar_bases([abas.get(n) for n in ABAS_BASES])
+    print(f"{sum(n in abas for n in ABAS_BASES)} bases importadas em {sys.argv[3]}")
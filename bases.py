@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import pandas as pd
+import streamlit as st
+
+from armazenamento import ABAS_BASES, obter_armazenamento
+from diagnostico import DIAG, medir
+from esquema import Esquema, esquema_auditores, esquema_perguntas, esquema_treinos, normalizar
+from indices import IndicePerguntas
+from painel import CuboProgresso, matriz_metas, metas_por_auditor
+from permissoes import RegistroAuditores, tabela_permissoes
+
+# --- BASES ESTÁTICAS (Treinamentos, Perguntas, Auditores) ---
+# Ficam numa cópia local em Parquet. A cópia é servida na hora (inclusive após
+# reinício) e atualizada em segundo plano; só é regravada quando o conteúdo muda.
+# A origem é o armazenamento configurado (Sheets ou SQLite).
+# Sem acesso ao Sheets, o app segue funcionando com a última cópia.
+PASTA_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_bases")
+IDADE_MAX = 600      # s até buscar de novo no Sheets (o antigo ttl do cache)
+ESPERA_ERRO = 60     # s entre tentativas com o Sheets fora
+
+
+# Limpeza + esquema, uma vez por carga
+class Bases(NamedTuple):
+    treinos: pd.DataFrame
+    perguntas: pd.DataFrame
+    auditores: Optional[pd.DataFrame]
+    esq_treinos: Esquema
+    esq_perguntas: Esquema
+    esq_auditores: Optional[Esquema]
+    versao: str
+
+
+# A cópia em disco já está limpa (e o Parquet guarda as categorias): só resolve o esquema
+def preparar_bases(df_t, df_p, df_a, limpar=True):
+    esq_t, esq_p = esquema_treinos(df_t), esquema_perguntas(df_p)
+    esq_a = esquema_auditores(df_a) if df_a is not None else None
+    if limpar:
+        with medir('bases.normalizar') as m:
+            normalizar(df_t, esq_t)
+            normalizar(df_p, esq_p)
+            if df_a is not None: normalizar(df_a, esq_a, papeis=('cpf',), categorias=())
+            m.linhas = len(df_t) + len(df_p) + (len(df_a) if df_a is not None else 0)
+    return df_t, df_p, df_a, esq_t, esq_p, esq_a
+
+
+def hash_bases(dfs):
+    h = hashlib.sha256()
+    for df in dfs:
+        if df is None: h.update(b'-'); continue
+        h.update("|".join(df.columns).encode())
+        h.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+# Estruturas derivadas das bases (metas, índices, cubo, cadastro), uma vez por versão
+def derivar_bases(b):
+    metas = b.perguntas.groupby(b.esq_perguntas.padrao, observed=True).size().to_dict()
+    matriz = matriz_metas(b.treinos, b.esq_treinos, metas)
+    registro = RegistroAuditores(b.auditores, b.esq_auditores)
+    return {'metas': metas,
+            'perguntas': IndicePerguntas(b.perguntas, b.esq_perguntas),
+            'cubo': CuboProgresso(b.treinos, b.esq_treinos, metas),
+            'auditores': registro,
+            'metas_auditores': metas_por_auditor(tabela_permissoes(registro), matriz)}
+
+
+class SnapshotBases:
+    def __init__(self, pasta, ler_remoto):
+        self._pasta = pasta
+        self._ler = ler_remoto
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()
+        self._thread = None
+        self.bases = None        # Bases atual (tabelas limpas + esquemas + hash)
+        self.gravado_em = None   # quando o conteúdo atual foi baixado
+        self.conferido = 0.0     # última ida ao Sheets (com ou sem mudança)
+        self.online = None
+        self.erro = None
+        self._ler_disco()
+
+    def _arquivo(self, nome): return os.path.join(self._pasta, f"{nome}.parquet")
+
+    def _ler_disco(self):
+        try:
+            with medir('bases.ler_disco'):
+                with open(os.path.join(self._pasta, "meta.json"), encoding="utf-8") as f: meta = json.load(f)
+                dados = [pd.read_parquet(self._arquivo(n)) if n in meta['abas'] else None for n in ABAS_BASES]
+            self.bases = Bases(*preparar_bases(*dados, limpar=False), meta['versao'])
+            self.gravado_em = meta['gravado_em']
+        except (OSError, ValueError, KeyError):
+            self.bases = None
+
+    def _gravar_disco(self, dados, versao):
+        os.makedirs(self._pasta, exist_ok=True)
+        abas = []
+        for nome, df in zip(ABAS_BASES, dados):
+            if df is None: continue
+            tmp = self._arquivo(nome) + ".tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self._arquivo(nome))
+            abas.append(nome)
+        tmp = os.path.join(self._pasta, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'versao': versao, 'gravado_em': time.time(), 'abas': abas}, f)
+        os.replace(tmp, os.path.join(self._pasta, "meta.json"))
+
+    def atualizar(self):
+        try:
+            dados = preparar_bases(*self._ler())
+        except Exception as e:
+            DIAG.registrar_erro('bases.atualizar', e)
+            self.online, self.erro, self.conferido = False, str(e), time.time() - IDADE_MAX + ESPERA_ERRO
+            return False
+        versao = hash_bases(dados[:3])
+        with self._lock:
+            if self.bases is None or versao != self.bases.versao:
+                self._gravar_disco(dados[:3], versao)
+                self.bases, self.gravado_em = Bases(*dados, versao), time.time()
+            self.online, self.erro, self.conferido = True, None, time.time()
+        return True
+
+    # Devolve a cópia atual. Sem cópia nenhuma (primeira execução), busca na hora;
+    # com cópia vencida, devolve ela e atualiza em segundo plano.
+    def obter(self):
+        if self.bases is None:
+            with self._lock_carga:
+                if self.bases is None: self.atualizar()
+        elif time.time() - self.conferido > IDADE_MAX:
+            self.atualizar_em_segundo_plano()
+        return self.bases
+
+    def atualizar_em_segundo_plano(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive(): return
+            self._thread = threading.Thread(target=self.atualizar, name="snapshot-bases", daemon=True)
+            self._thread.start()
+
+
+@st.cache_resource(show_spinner=False)
+def obter_snapshot():
+    return SnapshotBases(PASTA_SNAPSHOT, obter_armazenamento().ler_bases)
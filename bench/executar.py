@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import ArmazenamentoSheets
+from bases import Bases, derivar_bases, hash_bases, preparar_bases
+from bench.gerador import gerar
+from bench.planilha_falsa import PlanilhaFalsa, PoolFalso
+from diagnostico import DIAG
+from esquema import COLUNAS_RESPOSTAS
+from fila_gravacao import FilaGravacao
+from escopo import CacheEscopos
+from indices import padroes_por_cpf
+from painel import performance_auditores, status_por_pessoa, volumetria_por_padrao
+from respostas import RespostasCompartilhadas, novo_carimbo
+from sincronia import ABA_RESPOSTAS
+
+# --- BENCHMARK COM DADOS SINTÉTICOS ---
+# Roda as etapas do app (carga, deduplicação, preparo da execução, as duas visões
+# do painel, a tabela do Gestor e os salvamentos) contra o Sheets em memória e
+# grava um JSON com os tempos, para comparar com uma execução anterior.
+#
+#   python -m bench.executar --escala 10k
+#   python -m bench.executar --escala 100k --latencia 0.3 --saida bench_100k.json
+#   python -m bench.executar --escala 10k --comparar bench_10k.json   (sai com 1 se piorou)
+ESCALAS = {
+    "1k": {'treinados': 1_000, 'respostas': 20_000},
+    "10k": {'treinados': 10_000, 'respostas': 200_000},
+    "100k": {'treinados': 100_000, 'respostas': 1_000_000},
+}
+TOLERANCIA = 1.25   # mediana até 25% acima da referência não conta como piora
+
+
+def carregar_bases(arm):
+    dados = preparar_bases(*arm.ler_bases())
+    b = Bases(*dados, hash_bases(dados[:3]))
+    # Os escopos ficam num cache próprio por processo, como o obter_escopos() do app
+    return b, {**derivar_bases(b), 'escopos': CacheEscopos()}
+
+
+def opcoes(b, der, perms):
+    esc = der['escopos'].obter(b, perms)
+    return esc.filiais, esc.padroes
+
+
+# Página "EXECUTAR" no modo Por Padrões com todas as opções marcadas: filtro,
+# ranking, padrões por CPF e os contadores das 10 pessoas da primeira página
+def preparar_execucao(b, der, comp, perms):
+    esq = b.esq_treinos
+    esc = der['escopos'].obter(b, perms)
+    df_m = esc.treinos[esc.treinos[esq.filial].isin(esc.filiais) & esc.treinos[esq.padrao].isin(esc.padroes)]
+    rank = df_m.groupby([esq.cpf, esq.nome, esq.filial], observed=True).size().reset_index(name='Qtd')
+    rank = rank.sort_values(by=['Qtd', esq.filial], ascending=[False, True])
+    pads_cpf = padroes_por_cpf(df_m, esq)
+    visao = comp.visao(perms)
+    for cpf in rank[esq.cpf].iloc[:10].astype(str).str.strip():
+        pads = pads_cpf.get(cpf, [])
+        visao.contar(cpf, pads)
+        visao.preenchimento(cpf)
+        for p in pads: der['perguntas'].perguntas(p)
+    return rank
+
+
+def painel_pessoa(b, der, comp, perms):
+    opts_f, opts_p = opcoes(b, der, perms)
+    with comp.lock: fatia = der['cubo'].fatia(opts_f, opts_p, comp.contagem)
+    return status_por_pessoa(fatia)
+
+
+def painel_padrao(b, der, comp, perms):
+    opts_f, opts_p = opcoes(b, der, perms)
+    with comp.lock: fatia = der['cubo'].fatia(opts_f, opts_p, comp.contagem)
+    return volumetria_por_padrao(fatia, der['perguntas'].nomes)
+
+
+# O que cada rerun do painel paga depois de um salvamento: só saber se há respostas no recorte
+def master_vazia(comp, perms):
+    with comp.lock: comp.versao += 1
+    return comp.visao(perms).vazia()
+
+
+# Sem o DataFrame guardado da versão: o que paga o clique no download do Master
+def master(comp, perms):
+    with comp.lock: comp.versao += 1
+    return comp.visao(perms).to_df()
+
+
+def tabela_gestor(b, der, comp, perms):
+    opts_f, opts_p = opcoes(b, der, perms)
+    with comp.lock: fatia = der['cubo'].fatia(opts_f, opts_p, comp.contagem)
+    return performance_auditores(der['auditores'].nomes, der['metas_auditores'], fatia.por_auditor)
+
+
+# Um salvamento como o do formulário: todas as perguntas de um padrão da pessoa,
+# na fila local e na tabela compartilhada
+def salvar(b, der, comp, fila, linha, auditor):
+    esq = b.esq_treinos
+    id_envio, carimbo = uuid.uuid4().hex, novo_carimbo()
+    novos = [{"Data": "01/07/2026 12:00", "Filial": str(linha[esq.filial]), "Funcionario": linha[esq.nome],
+              "CPF": str(linha[esq.cpf]), "Padrao": str(linha[esq.padrao]), "Pergunta": texto, "Resultado": "Conforme",
+              "Observacao": "", "Auditor_Nome": auditor['Nome'], "Auditor_CPF": auditor['CPF'],
+              "Submissao_ID": id_envio, "Carimbo": carimbo}
+             for _, texto in der['perguntas'].perguntas(linha[esq.padrao])]
+    fila.enfileirar([[str(r.get(c, "")) for c in COLUNAS_RESPOSTAS] for r in novos], id_envio)
+    comp.registrar(novos)
+
+
+def cronometrar(fn, repeticoes):
+    tempos, res = [], None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        res = fn()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return res, {'repeticoes': repeticoes, 'min_ms': round(min(tempos), 2),
+                 'mediana_ms': round(statistics.median(tempos), 2), 'max_ms': round(max(tempos), 2)}
+
+
+def rodar(treinados, respostas, latencia, por_mil_linhas, repeticoes, salvamentos, cota=False, semente=1):
+    etapas = {}
+    t0 = time.perf_counter()
+    abas = gerar(treinados=treinados, respostas=respostas, semente=semente)
+    gerado_ms = (time.perf_counter() - t0) * 1000
+    planilha = PlanilhaFalsa(abas, latencia, por_mil_linhas)
+    arm = ArmazenamentoSheets(PoolFalso(planilha, cota=cota))
+    DIAG.limpar()
+
+    (b, der), etapas['carga_bases'] = cronometrar(lambda: carregar_bases(arm), repeticoes)
+    comp, etapas['carga_respostas'] = cronometrar(lambda: _sincronizado(arm), repeticoes)
+    regs, _ = arm.sincronia().buscar()   # o log inteiro, com as linhas refeitas
+    _, etapas['deduplicacao'] = cronometrar(lambda: RespostasCompartilhadas(None).registrar(regs), repeticoes)
+
+    reg = der['auditores']
+    _, etapas['login'] = cronometrar(lambda: [reg.obter(a.cpf) for a in reg.auditores], repeticoes)
+    gestor = next(a for a in reg.auditores if a.gestor).permissoes()
+    aud = next(a for a in reg.auditores if not a.gestor)
+    auditor = aud.permissoes()
+    for nome, perms in (('gestor', gestor), ('auditor', auditor)):
+        _, etapas[f'execucao_{nome}'] = cronometrar(lambda: preparar_execucao(b, der, comp, perms), repeticoes)
+        _, etapas[f'painel_pessoa_{nome}'] = cronometrar(lambda: painel_pessoa(b, der, comp, perms), repeticoes)
+        _, etapas[f'painel_padrao_{nome}'] = cronometrar(lambda: painel_padrao(b, der, comp, perms), repeticoes)
+        _, etapas[f'master_vazia_{nome}'] = cronometrar(lambda: master_vazia(comp, perms), repeticoes)
+        _, etapas[f'master_{nome}'] = cronometrar(lambda: master(comp, perms), repeticoes)
+    _, etapas['tabela_gestor'] = cronometrar(lambda: tabela_gestor(b, der, comp, gestor), repeticoes)
+
+    # Salvamentos: o tempo local de cada um e o tempo até a fila esvaziar na planilha
+    pasta = tempfile.mkdtemp(prefix="bench_fila_")
+    fila = FilaGravacao(os.path.join(pasta, "fila.db"), arm.gravar, comp.ja_gravadas)
+    linhas_t = b.treinos.sample(n=min(salvamentos, len(b.treinos)), random_state=semente)
+    quem = {'Nome': aud.nome, 'CPF': aud.cpf}
+    antes = len(planilha.valores(ABA_RESPOSTAS))
+    t_fila = time.perf_counter()
+    tempos = []
+    for _, linha in linhas_t.iterrows():
+        t1 = time.perf_counter()
+        salvar(b, der, comp, fila, linha, quem)
+        tempos.append((time.perf_counter() - t1) * 1000)
+    etapas['salvar_local'] = {'repeticoes': len(tempos), 'min_ms': round(min(tempos), 2),
+                              'mediana_ms': round(statistics.median(tempos), 2), 'max_ms': round(max(tempos), 2)}
+    while fila.pendentes(): time.sleep(0.01)
+    etapas['salvar_ate_nuvem'] = {'repeticoes': 1, 'min_ms': None, 'max_ms': None,
+                                  'mediana_ms': round((time.perf_counter() - t_fila) * 1000, 2),
+                                  'linhas': len(planilha.valores(ABA_RESPOSTAS)) - antes}
+    _, etapas['sincronia_incremental'] = cronometrar(lambda: comp.sincronizar(forcar=True), 1)
+
+    return {
+        'gerado_em': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'ambiente': {'host': socket.gethostname(), 'python': platform.python_version(), 'pandas': pd.__version__,
+                     'numpy': np.__version__, 'plataforma': platform.platform()},
+        'parametros': {'treinados': treinados, 'respostas': respostas, 'latencia': latencia,
+                       'por_mil_linhas': por_mil_linhas, 'repeticoes': repeticoes, 'salvamentos': salvamentos,
+                       'cota': cota, 'semente': semente},
+        'dados': {nome: len(v) - 1 for nome, v in abas.items()},
+        'geracao_ms': round(gerado_ms, 2),
+        'chamadas_sheets': planilha.chamadas,
+        'etapas': etapas,
+        'detalhe': json.loads(DIAG.para_json())['resumo'],
+    }
+
+
+def _sincronizado(arm):
+    comp = RespostasCompartilhadas(arm.sincronia())
+    comp.sincronizar(forcar=True)
+    return comp
+
+
+# Etapas cuja mediana passou de tolerancia x a da referência: [(etapa, ref, atual)]
+def comparar(atual, referencia, tolerancia=TOLERANCIA):
+    pioras = []
+    for etapa, m in atual['etapas'].items():
+        ref = referencia.get('etapas', {}).get(etapa)
+        if not ref or not ref.get('mediana_ms'): continue
+        if m['mediana_ms'] > ref['mediana_ms'] * tolerancia: pioras.append((etapa, ref['mediana_ms'], m['mediana_ms']))
+    return pioras
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark do app com dados sintéticos e Sheets em memória")
+    ap.add_argument("--escala", choices=sorted(ESCALAS), default="1k")
+    ap.add_argument("--treinados", type=int, help="sobrepõe o número de pessoas da escala")
+    ap.add_argument("--respostas", type=int, help="sobrepõe o número de linhas da Respostas_DB")
+    ap.add_argument("--latencia", type=float, default=0.0, help="s por chamada ao Sheets")
+    ap.add_argument("--por-mil-linhas", type=float, default=0.0, help="s extras por 1000 linhas lidas/gravadas")
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--salvamentos", type=int, default=50)
+    ap.add_argument("--cota", action="store_true", help="mantém o limite de chamadas por minuto do app")
+    ap.add_argument("--semente", type=int, default=1)
+    ap.add_argument("--saida", help="arquivo JSON (padrão: bench_<escala>.json)")
+    ap.add_argument("--comparar", help="JSON de referência; sai com código 1 se alguma etapa piorou")
+    ap.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    a = ap.parse_args(argv)
+
+    esc = ESCALAS[a.escala]
+    res = rodar(a.treinados or esc['treinados'], a.respostas or esc['respostas'], a.latencia, a.por_mil_linhas,
+                a.repeticoes, a.salvamentos, a.cota, a.semente)
+    saida = a.saida or f"bench_{a.escala}.json"
+    with open(saida, "w", encoding="utf-8") as f: json.dump(res, f, ensure_ascii=False, indent=2)
+
+    print(f"{res['dados']}  ->  {saida}")
+    for etapa, m in res['etapas'].items(): print(f"  {etapa:<26}{m['mediana_ms']:>12.1f} ms")
+    if a.comparar:
+        with open(a.comparar, encoding="utf-8") as f: ref = json.load(f)
+        pioras = comparar(res, ref, a.tolerancia)
+        for etapa, antes, agora in pioras: print(f"  PIOROU {etapa}: {antes:.1f} -> {agora:.1f} ms")
+        if pioras: return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from esquema import COLUNAS_RESPOSTAS
+
+# --- DADOS SINTÉTICOS PARA O BENCHMARK ---
+# Gera as quatro abas no formato em que o Sheets devolve (lista de linhas de texto,
+# cabeçalho na primeira), com as mesmas esquisitices da planilha real: padrões
+# numéricos e com letras, CPFs de 11 dígitos, linhas de treinamento repetidas,
+# permissões "Todas"/listas por vírgula, respostas refeitas (linhas mortas no log)
+# e linhas antigas sem Submissao_ID/Carimbo.
+PRIMEIROS = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Hugo", "Isabel", "João",
+             "Karina", "Lucas", "Marina", "Nelson", "Olga", "Paulo", "Renata", "Sérgio", "Tânia", "Vítor"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Ferreira", "Almeida", "Ribeiro",
+              "Carvalho", "Gomes", "Martins", "Rocha", "Barbosa", "Mendes", "Araújo", "Cardoso", "Teixeira", "Moreira"]
+UFS = ["SP", "MG", "PR", "RS", "SC", "GO", "BA", "PE", "RJ", "MT"]
+RESULTADOS = np.array(["Conforme", "Não Conforme", "Não se Aplica"])
+PESO_RESULTADOS = [0.85, 0.10, 0.05]
+
+
+def _cpfs(rng, n):
+    return [f"{c:011d}" for c in rng.choice(9 * 10 ** 10, size=n, replace=False) + 10 ** 10]
+
+
+def _nomes(rng, n):
+    p, s1, s2 = rng.integers(0, len(PRIMEIROS), n), rng.integers(0, len(SOBRENOMES), n), rng.integers(0, len(SOBRENOMES), n)
+    return [f"{PRIMEIROS[a]} {SOBRENOMES[b]} {SOBRENOMES[c]}" for a, b, c in zip(p, s1, s2)]
+
+
+def _tabela(cabecalho, colunas):
+    colunas = [c.tolist() if isinstance(c, np.ndarray) else c for c in colunas]
+    return [list(cabecalho)] + [list(l) for l in zip(*colunas)]
+
+
+# treinados = pessoas distintas, cada uma com 1 a max_padroes_pessoa padrões;
+# respostas = linhas da Respostas_DB, das quais a fração refeitas refaz uma
+# resposta já dada. Mesma semente, mesmos dados.
+def gerar(treinados=1000, respostas=20000, filiais=30, padroes=60, perguntas=(5, 15), auditores=40, gestores=3,
+          max_padroes_pessoa=6, repetidas=0.02, refeitas=0.15, sem_carimbo=0.10, semente=1):
+    rng = np.random.default_rng(semente)
+    cod_fil = [f"{UFS[i % len(UFS)]}{i // len(UFS) + 1:02d}" for i in range(filiais)]
+    # Metade numérica (o Sheets devolve "101", às vezes "101.0"), metade com letras
+    cod_pad = [str(100 + i) if i % 2 == 0 else f"SCA-{i:03d}" for i in range(padroes)]
+
+    # Padroes_Perguntas: de perguntas[0] a perguntas[1] por padrão
+    n_perg = rng.integers(perguntas[0], perguntas[1] + 1, padroes)
+    inicio_perg = np.concatenate([[0], np.cumsum(n_perg)[:-1]])
+    pad_p = np.repeat(np.arange(padroes), n_perg)
+    num_p = np.arange(len(pad_p)) - inicio_perg[pad_p] + 1
+    textos = np.array([f"{n}. Item {n} verificado no padrão {cod_pad[p]}?" for p, n in zip(pad_p, num_p)], dtype=object)
+    aba_perg = _tabela(["Padrao", "Nome Padrao", "Pergunta"],
+                       [[cod_pad[p] for p in pad_p], [f"Padrão de trabalho {cod_pad[p]}" for p in pad_p], textos])
+
+    # Base_Treinamentos: uma linha por (pessoa, padrão), algumas repetidas
+    cpfs, nomes = _cpfs(rng, treinados), _nomes(rng, treinados)
+    fil_pessoa = rng.integers(0, filiais, treinados)
+    qtd = rng.integers(1, min(max_padroes_pessoa, padroes) + 1, treinados)
+    pessoa_t = np.repeat(np.arange(treinados), qtd)
+    # Padrões distintos por pessoa: saltos (primos com o total) a partir de um início sorteado
+    passo = np.arange(len(pessoa_t)) - np.repeat(np.cumsum(qtd) - qtd, qtd)
+    salto = next(s for s in range(7, 7 + padroes + 1) if math.gcd(s, padroes) == 1)
+    pad_t = (np.repeat(rng.integers(0, padroes, treinados), qtd) + passo * salto) % padroes
+    extra = rng.choice(len(pessoa_t), size=int(len(pessoa_t) * repetidas), replace=True)
+    pessoa_t, pad_t = np.concatenate([pessoa_t, pessoa_t[extra]]), np.concatenate([pad_t, pad_t[extra]])
+    aba_tr = _tabela(["Filial", "CPF", "Nome", "Padrao"],
+                     [[cod_fil[fil_pessoa[i]] for i in pessoa_t], [cpfs[i] for i in pessoa_t],
+                      [nomes[i] for i in pessoa_t], [cod_pad[p] for p in pad_t]])
+
+    # Cadastro_Auditores: gestores com tudo; auditores com 1-4 filiais e, metade, lista de padrões
+    cpf_aud, nome_aud = _cpfs(rng, auditores), _nomes(rng, auditores)
+    perfis, fils_aud, pads_aud = [], [], []
+    for i in range(auditores):
+        if i < gestores:
+            perfis.append("Gestor"); fils_aud.append("Todas"); pads_aud.append("Todos")
+            continue
+        perfis.append("Auditor")
+        fils_aud.append(", ".join(cod_fil[j] for j in rng.choice(filiais, size=rng.integers(1, min(4, filiais) + 1), replace=False)))
+        pads_aud.append("Todos" if i % 2 else ",".join(cod_pad[j] for j in rng.choice(padroes, size=rng.integers(3, min(10, padroes) + 1), replace=False)))
+    aba_aud = _tabela(["Nome", "CPF", "Perfil", "Filiais", "Padroes"], [nome_aud, cpf_aud, perfis, fils_aud, pads_aud])
+
+    # Respostas_DB: sorteia linhas de treinamento e perguntas do padrão; uma parte
+    # das respostas é refeita mais tarde (mesma chave, Carimbo maior)
+    unicas = max(1, int(respostas * (1 - refeitas)))
+    lin = rng.integers(0, len(pessoa_t), unicas)
+    perg = inicio_perg[pad_t[lin]] + (rng.random(unicas) * n_perg[pad_t[lin]]).astype(int)
+    refazer = rng.integers(0, unicas, respostas - unicas)
+    lin, perg = np.concatenate([lin, lin[refazer]]), np.concatenate([perg, perg[refazer]])
+    pessoa_r = pessoa_t[lin]
+
+    resultado = rng.choice(RESULTADOS, size=respostas, p=PESO_RESULTADOS)
+    obs = np.where(resultado == "Não Conforme", "Ajustar conforme padrão", "")
+    auditor = rng.integers(gestores if auditores > gestores else 0, auditores, respostas)
+    # Em ordem de envio: datas e carimbos crescentes ao longo de 180 dias
+    segundos = np.sort(rng.integers(0, 180 * 86400, respostas))
+    t0 = datetime(2026, 1, 1)
+    datas = [(t0 + timedelta(seconds=int(s))).strftime("%d/%m/%Y %H:%M") for s in segundos]
+    carimbo = (int(t0.timestamp()) + segundos) * 10 ** 6 + np.arange(respostas) % 10 ** 6
+    legado = np.arange(respostas) < int(respostas * sem_carimbo)   # as mais antigas, de antes do Carimbo
+    envio = np.arange(respostas) // 8   # ~ um formulário por envio
+    ids = np.where(legado, "", np.char.add("bench-", envio.astype(str)))
+    carimbos = np.where(legado, "", carimbo.astype(str))
+
+    aba_resp = _tabela(COLUNAS_RESPOSTAS, [
+        datas, [cod_fil[fil_pessoa[i]] for i in pessoa_r], [nomes[i] for i in pessoa_r], [cpfs[i] for i in pessoa_r],
+        [cod_pad[p] for p in pad_t[lin]], textos[perg], resultado, obs,
+        [nome_aud[a] for a in auditor], [cpf_aud[a] for a in auditor], ids, carimbos])
+
+    return {"Base_Treinamentos": aba_tr, "Padroes_Perguntas": aba_perg, "Cadastro_Auditores": aba_aud, "Respostas_DB": aba_resp}
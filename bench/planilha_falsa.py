@@ -0,0 +1,130 @@
+import threading
+import time
+
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+from conexao import BaldeTokens, PoolSheets
+
+# --- SHEETS EM MEMÓRIA ---
+# Faz o papel do cliente gspread + planilha (open_by_url, worksheet, add_worksheet)
+# e das abas, com as chamadas que o app usa. Cada chamada espera
+# latencia + por_mil_linhas * (linhas lidas ou gravadas / 1000) segundos, para
+# simular a ida e volta ao Google sem tocar na planilha de verdade.
+
+
+# O que o Sheets guarda de um valor digitado (USER_ENTERED): "'x" vira o texto x;
+# inteiro com mais de 15 dígitos vira número e volta arredondado ("1.79232E+15")
+def _digitado(v):
+    v = str(v)
+    if v.startswith("'"): return v[1:]
+    if v.isdigit() and len(v.lstrip('0')) > 15: return f"{float(v):.5E}"
+    return v
+
+
+class AbaFalsa:
+    def __init__(self, planilha, titulo, valores):
+        self._planilha = planilha
+        self.title = titulo
+        self._valores = valores
+        self._cols = max((len(l) for l in valores), default=1)
+
+    @property
+    def row_count(self): return max(len(self._valores), 1)
+
+    @property
+    def col_count(self): return self._cols
+
+    def _faixa(self, a1):
+        g = a1_range_to_grid_range(a1)
+        ini, fim = g.get('startRowIndex', 0), g.get('endRowIndex', len(self._valores))
+        c0, c1 = g.get('startColumnIndex', 0), g.get('endColumnIndex')
+        return [list(l[c0:c1]) for l in self._valores[ini:fim]]
+
+    def get_values(self, *args, **kwargs):
+        res = [list(l) for l in self._valores]
+        self._planilha.esperar(len(res))
+        return res
+
+    def batch_get(self, faixas, **kwargs):
+        res = [self._faixa(f) for f in faixas]
+        self._planilha.esperar(sum(len(r) for r in res))
+        return res
+
+    def row_values(self, n):
+        self._planilha.esperar(1)
+        return list(self._valores[n - 1]) if len(self._valores) >= n else []
+
+    def append_rows(self, linhas, value_input_option="RAW", **kwargs):
+        self._planilha.esperar(len(linhas))
+        conv = _digitado if value_input_option == "USER_ENTERED" else str
+        with self._planilha.lock: self._valores.extend([conv(v) for v in l] for l in linhas)
+
+    def update(self, values=None, range_name='A1', **kwargs):
+        self._planilha.esperar(len(values))
+        ini = a1_range_to_grid_range(range_name).get('startRowIndex', 0)
+        with self._planilha.lock:
+            for i, l in enumerate(values, start=ini):
+                if i < len(self._valores): self._valores[i] = [str(v) for v in l]
+                else: self._valores.append([str(v) for v in l])
+
+    def resize(self, rows=None, cols=None):
+        self._planilha.esperar(0)
+        if cols: self._cols = cols
+
+    def add_cols(self, n):
+        self._planilha.esperar(0)
+        self._cols += n
+
+    def batch_clear(self, faixas):
+        self._planilha.esperar(0)
+        with self._planilha.lock:
+            for f in faixas:
+                g = a1_range_to_grid_range(f)
+                del self._valores[g.get('startRowIndex', 0):g.get('endRowIndex', len(self._valores))]
+
+    def delete_rows(self, inicio, fim=None):
+        self._planilha.esperar(0)
+        with self._planilha.lock: del self._valores[inicio - 1:(fim or inicio)]
+
+
+class PlanilhaFalsa:
+    def __init__(self, abas, latencia=0.0, por_mil_linhas=0.0):
+        self._abas = {nome: AbaFalsa(self, nome, [list(l) for l in valores]) for nome, valores in abas.items()}
+        self.latencia, self.por_mil_linhas = latencia, por_mil_linhas
+        self.lock = threading.Lock()
+        self.chamadas = 0
+
+    def esperar(self, linhas):
+        with self.lock: self.chamadas += 1
+        espera = self.latencia + self.por_mil_linhas * linhas / 1000
+        if espera > 0: time.sleep(espera)
+
+    def open_by_url(self, url):
+        self.esperar(0)
+        return self
+
+    def worksheet(self, nome):
+        self.esperar(0)
+        if nome not in self._abas: raise gspread.exceptions.WorksheetNotFound(nome)
+        return self._abas[nome]
+
+    def add_worksheet(self, title, rows, cols):
+        self.esperar(0)
+        self._abas[title] = AbaFalsa(self, title, [])
+        return self._abas[title]
+
+    def valores(self, nome):
+        return self._abas[nome]._valores
+
+
+# PoolSheets ligado à planilha falsa. Sem cota=True, o balde de tokens não segura
+# as chamadas (mede o app, não a cota de 60/min do Google).
+class PoolFalso(PoolSheets):
+    def __init__(self, planilha, cota=False):
+        super().__init__({'spreadsheet': 'memoria'})
+        self._planilha = planilha
+        if not cota: self._balde = BaldeTokens(10 ** 9, 10 ** 9)
+
+    def _cliente(self):
+        return self._planilha
@@ -0,0 +1,92 @@
+import threading
+
+import gspread
+import pandas as pd
+
+from esquema import ESQUEMA_RESPOSTAS, limpar_serie, linhas_como_texto
+from sincronia import ABA_RESPOSTAS, ABA_SNAPSHOT
+
+# --- COMPACTAÇÃO DA Respostas_DB ---
+# A Respostas_DB só recebe append: cada resposta refeita deixa uma linha morta.
+# A compactação junta Respostas_Snapshot + log, fica com a última linha de cada
+# (CPF, Padrao, Pergunta), regrava o snapshot e apaga do log as linhas lidas.
+# As linhas substituídas vão para abas de arquivo por mês (Respostas_Arquivo_AAAA_MM).
+# Ordem segura: arquivo -> snapshot -> apagar log. Se parar no meio, a leitura
+# (log + snapshot) continua completa; no máximo o arquivo recebe linhas repetidas.
+#
+#   python compactacao.py    (usa o armazenamento do .streamlit/secrets.toml)
+ABA_ARQUIVO = "Respostas_Arquivo_{}"
+CHAVE = (ESQUEMA_RESPOSTAS.cpf, ESQUEMA_RESPOSTAS.padrao, ESQUEMA_RESPOSTAS.pergunta)
+_lock = threading.Lock()
+
+
+def _tabela(valores):
+    if not valores: return pd.DataFrame()
+    cab = [str(c).strip() for c in valores[0]]
+    while cab and not cab[-1]: cab.pop()
+    linhas = [[str(v) for v in l[:len(cab)]] + [''] * (len(cab) - len(l)) for l in valores[1:]]
+    df = pd.DataFrame(linhas, columns=cab)
+    return df[df.apply(lambda c: c.str.strip() != '').any(axis=1)]
+
+
+def _ler(pool, aba):
+    try: return pool.executar('compactar_ler', aba, lambda w: w.get_values())
+    except gspread.exceptions.WorksheetNotFound: return []
+
+
+# Separa o estado atual das linhas substituídas. Vale o Carimbo mais novo; linhas
+# sem Carimbo válido (antigas, ou que o Sheets gravou como número e arredondou)
+# contam como mais velhas e seguem a ordem física entre si, como no carimbo_de.
+def separar(df):
+    if df.empty: return df, df
+    if 'Carimbo' in df.columns:
+        c = df['Carimbo'].astype(str).str.strip()
+        ordem = pd.to_numeric(c.where(c.str.isdigit()), errors='coerce').fillna(0)
+        df = df.iloc[ordem.to_numpy().argsort(kind='stable')]
+    chave = pd.DataFrame({c: limpar_serie(df[c]) for c in CHAVE})
+    morta = chave.duplicated(keep='last').to_numpy()
+    return df[~morta], df[morta]
+
+
+def particoes_por_mes(df):
+    mes = pd.to_datetime(df['Data'], format='%d/%m/%Y %H:%M', errors='coerce').dt.strftime('%Y_%m').fillna('sem_data')
+    return {ABA_ARQUIVO.format(m): g for m, g in df.groupby(mes.to_numpy(), sort=True)}
+
+
+# Cada chamada ao Sheets num executar próprio (um token do balde cada);
+# row_count/col_count vêm dos metadados da aba, sem ida ao Sheets
+def _sobrescrever(pool, aba, valores):
+    n, m = len(valores), len(valores[0])
+    wks = pool.aba(aba)
+    if wks.row_count < n or wks.col_count < m:
+        pool.executar('redimensionar', aba, lambda w: w.resize(rows=max(n, w.row_count), cols=max(m, w.col_count)))
+    pool.executar('gravar_snapshot', aba, lambda w: w.update(values=valores, range_name='A1'))   # RAW (padrão): Carimbo/Submissao_ID continuam texto
+    if pool.aba(aba).row_count > n:
+        pool.executar('limpar_snapshot', aba, lambda w: w.batch_clear([f"{n + 1}:{w.row_count}"]))
+
+
+def compactar_sheets(pool):
+    with _lock:
+        log = pool.executar('compactar_ler', ABA_RESPOSTAS, lambda w: w.get_values())
+        df_log, df_snap = _tabela(log), _tabela(_ler(pool, ABA_SNAPSHOT))
+        if df_log.empty: return {'log': 0, 'snapshot': len(df_snap), 'arquivadas': 0, 'particoes': {}}
+
+        colunas = list(df_log.columns) + [c for c in df_snap.columns if c not in df_log.columns]
+        atual, mortas = separar(pd.concat([df_snap, df_log], ignore_index=True).reindex(columns=colunas).fillna(''))
+
+        particoes = particoes_por_mes(mortas) if not mortas.empty else {}
+        for aba, g in particoes.items():
+            pool.aba_ou_criar(aba, colunas)
+            pool.append_rows(aba, linhas_como_texto(g.to_numpy().tolist(), colunas))
+
+        pool.aba_ou_criar(ABA_SNAPSHOT, colunas)
+        _sobrescrever(pool, ABA_SNAPSHOT, [colunas] + atual.to_numpy().tolist())
+        # Só as linhas lidas: o que entrou depois (appends no fim) continua no log
+        pool.executar('apagar_log', ABA_RESPOSTAS, lambda w: w.delete_rows(2, len(log)))
+        return {'log': len(df_log), 'snapshot': len(atual), 'arquivadas': len(mortas),
+                'particoes': {a: len(g) for a, g in particoes.items()}}
+
+
+if __name__ == "__main__":
+    from armazenamento import obter_armazenamento
+    print(obter_armazenamento().compactar())
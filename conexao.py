@@ -0,0 +1,211 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import gspread
+import requests
+import streamlit as st
+from google.auth.exceptions import RefreshError, TransportError
+from google.auth.transport.requests import Request
+
+from diagnostico import DIAG, tamanho
+
+# --- CONEXÃO ÚNICA COM O GOOGLE SHEETS ---
+# Um cliente autorizado por processo, com as abas já abertas. Evita a troca de token
+# OAuth e as duas leituras de metadados que cada salvamento fazia.
+#
+# Todas as chamadas, inclusive as de metadados (abrir a planilha, localizar ou criar
+# abas), passam por um balde de tokens do processo (a cota do Google é por minuto,
+# somando todas as sessões). 429 e 5xx são repetidos com espera exponencial + jitter.
+# Leituras idênticas simultâneas viram uma só ida ao Sheets.
+MARGEM_TOKEN = timedelta(minutes=5)
+ERROS_TRANSPORTE = (RefreshError, TransportError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+CHAMADAS_POR_MIN = 55   # abaixo da cota de 60/min por usuário
+RAJADA = 10             # chamadas liberadas de uma vez com o balde cheio
+TENTATIVAS_COTA = 6     # tentativas em 429/5xx antes de desistir
+ESPERA_BASE = 1.0       # s; dobra a cada tentativa
+ESPERA_TETO = 32.0
+
+
+def _status(e):
+    return e.response.status_code if isinstance(e, gspread.exceptions.APIError) else None
+
+
+def _erro_de_conexao(e):
+    if isinstance(e, ERROS_TRANSPORTE): return True
+    # 401 = token recusado; o cliente precisa ser refeito
+    return _status(e) == 401
+
+
+def _erro_de_cota(e):
+    s = _status(e)
+    return s is not None and (s == 429 or s >= 500)
+
+
+class BaldeTokens:
+    def __init__(self, por_minuto, rajada):
+        self._taxa = por_minuto / 60.0
+        self._cap = float(rajada)
+        self._tokens = float(rajada)
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Bloqueia até haver token; devolve quanto tempo esperou
+    def tomar(self):
+        esperou = 0.0
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self._cap, self._tokens + (agora - self._t) * self._taxa)
+                self._t = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return esperou
+                falta = (1 - self._tokens) / self._taxa
+            time.sleep(falta)
+            esperou += falta
+
+
+class _Voo:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.res = None
+        self.erro = None
+
+
+class PoolSheets:
+    def __init__(self, creds):
+        self._creds = dict(creds)
+        self._lock = threading.RLock()
+        self._gc = None
+        self._sh = None
+        self._abas = {}
+        self._lock_conexao = threading.Lock()
+        self._balde = BaldeTokens(CHAMADAS_POR_MIN, RAJADA)
+        self._voos = {}
+        self._lock_voos = threading.Lock()
+
+    def _credenciais(self):
+        # gspread 5 guarda em gc.auth; o 6 em gc.http_client.auth
+        cred = getattr(self._gc, 'auth', None)
+        if cred is None: cred = getattr(getattr(self._gc, 'http_client', None), 'auth', None)
+        return cred
+
+    def _cliente(self):
+        return gspread.service_account_from_dict(self._creds)
+
+    def _conectar(self):
+        # Só guarda o cliente com a planilha aberta: se open_by_url falhar, a próxima tentativa conecta de novo
+        gc = self._cliente()
+        sh = self._chamar('open_by_url', None, lambda: gc.open_by_url(self._creds['spreadsheet']))
+        with self._lock: self._gc, self._sh, self._abas = gc, sh, {}
+        return sh
+
+    def _renovar_token(self):
+        cred = self._credenciais()
+        if cred is None: return
+        exp = getattr(cred, 'expiry', None)
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth usa UTC sem fuso
+        if not cred.token or (exp and exp - agora < MARGEM_TOKEN): cred.refresh(Request())
+
+    def reconectar(self):
+        with self._lock:
+            self._gc, self._sh, self._abas = None, None, {}
+
+    # A planilha aberta, conectando (ou renovando o token) se preciso. _lock só
+    # protege _gc/_sh/_abas e nunca fica preso esperando token ou o Sheets;
+    # _lock_conexao segura apenas quem precisa da conexão que está sendo aberta.
+    def _abrir_planilha(self):
+        with self._lock_conexao:
+            with self._lock: gc, sh = self._gc, self._sh
+            if gc is None: return self._conectar()
+            self._renovar_token()
+            return sh
+
+    def aba(self, nome):
+        sh = self._abrir_planilha()
+        with self._lock: wks = self._abas.get(nome)
+        if wks is None:
+            wks = self._chamar('worksheet', nome, lambda: sh.worksheet(nome))
+            with self._lock:
+                if self._sh is sh: wks = self._abas.setdefault(nome, wks)
+        return wks
+
+    # Como aba(), mas cria a aba (só com o cabeçalho) quando ela ainda não existe.
+    # Só a compactação cria abas, e ela já roda uma por vez.
+    def aba_ou_criar(self, nome, cabecalho):
+        try: return self._repetir('worksheet', lambda: self.aba(nome))
+        except gspread.exceptions.WorksheetNotFound: pass
+
+        def criar():
+            sh = self._abrir_planilha()
+            return self._chamar('add_worksheet', nome, lambda: sh.add_worksheet(title=nome, rows=1, cols=max(1, len(cabecalho))))
+        wks = self._repetir('add_worksheet', criar)
+        self._repetir('update', lambda: self._chamar('update', nome, lambda: wks.update(values=[list(cabecalho)], range_name='A1')))
+        with self._lock: self._abas.setdefault(nome, wks)
+        return wks
+
+    # Uma chamada ao Sheets: pega um token do balde e mede o tempo
+    def _chamar(self, op, detalhe, fn):
+        espera = self._balde.tomar()
+        if espera: DIAG.registrar('sheets.espera_cota', espera * 1000, detalhe=detalhe)
+        t0 = time.perf_counter()
+        res = fn()
+        DIAG.registrar(f"sheets.{op}", (time.perf_counter() - t0) * 1000, *tamanho(res), detalhe=detalhe)
+        return res
+
+    # Em erro de autenticação/transporte, refaz o cliente e tenta mais uma vez; em
+    # 429/5xx, espera (exponencial com jitter) e tenta de novo.
+    def _repetir(self, op, fn):
+        reconectou, cota = False, 0
+        while True:
+            try: return fn()
+            except Exception as e:
+                DIAG.registrar_erro(f"sheets.{op}", e)
+                if _erro_de_conexao(e) and not reconectou:
+                    reconectou = True
+                    self.reconectar()
+                elif _erro_de_cota(e) and cota < TENTATIVAS_COTA - 1:
+                    cota += 1
+                    time.sleep(min(ESPERA_TETO, ESPERA_BASE * 2 ** cota) * random.uniform(0.5, 1.0))
+                else: raise
+
+    # Roda fn(worksheet) pelo balde, com as repetições de _repetir. A aba é
+    # obtida a cada tentativa: depois de reconectar, ela é aberta de novo.
+    def executar(self, op, nome_aba, fn):
+        def tentativa():
+            wks = self.aba(nome_aba)
+            return self._chamar(op, nome_aba, lambda: fn(wks))
+        return self._repetir(op, tentativa)
+
+    # Leitura com coalescência: se a mesma leitura (op, aba, chave) já está em voo,
+    # espera por ela e devolve o mesmo resultado em vez de chamar o Sheets de novo.
+    # O resultado é compartilhado; quem recebe não deve alterá-lo.
+    def ler(self, op, nome_aba, fn, chave=None):
+        k = (op, nome_aba, chave)
+        with self._lock_voos:
+            voo = self._voos.get(k)
+            lider = voo is None
+            if lider: voo = self._voos[k] = _Voo()
+        if not lider:
+            voo.pronto.wait()
+            if voo.erro is not None: raise voo.erro
+            return voo.res
+        try:
+            voo.res = self.executar(op, nome_aba, fn)
+            return voo.res
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock_voos: self._voos.pop(k, None)
+            voo.pronto.set()
+
+    def append_rows(self, nome_aba, linhas):
+        return self.executar('append_rows', nome_aba, lambda w: w.append_rows(linhas, value_input_option="USER_ENTERED"))
+
+
+@st.cache_resource(show_spinner=False)
+def obter_pool():
+    return PoolSheets(st.secrets["connections"]["gsheets"])
@@ -0,0 +1,102 @@
+import json
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# --- DIAGNÓSTICO DE DESEMPENHO ---
+# Medições leves (etapa, ms, linhas, bytes, erro) guardadas num buffer circular
+# do processo. Cada etapa do caminho crítico abre um medir(); o painel do Gestor
+# mostra o resumo por etapa e exporta tudo em CSV/JSON para comparar deploys.
+MAX_MEDICOES = 5000
+INICIO_PROCESSO = time.time()
+
+
+class Medicao:
+    __slots__ = ('linhas', 'bytes', 'detalhe')
+
+    def __init__(self, detalhe=None):
+        self.linhas, self.bytes, self.detalhe = None, None, detalhe
+
+
+# (linhas, bytes) aproximados de uma resposta do Sheets: listas de linhas, ou
+# listas delas (batch_get). Outros tipos não são contados.
+def tamanho(valores):
+    if not isinstance(valores, list): return None, None
+    linhas = bytes_ = 0
+    for item in valores:
+        if isinstance(item, list) and item and isinstance(item[0], list):
+            l, b = tamanho(item)
+            linhas, bytes_ = linhas + l, bytes_ + b
+        elif isinstance(item, list):
+            linhas += 1
+            bytes_ += sum(len(str(v)) for v in item)
+    return linhas, bytes_
+
+
+class Diagnostico:
+    def __init__(self, maximo=MAX_MEDICOES):
+        self.maximo = maximo
+        self._medicoes = deque(maxlen=maximo)
+        self._lock = threading.Lock()
+
+    def __len__(self): return len(self._medicoes)
+
+    def registrar(self, etapa, ms, linhas=None, bytes_=None, erro=None, detalhe=None):
+        with self._lock:
+            self._medicoes.append({'quando': time.time(), 'etapa': etapa, 'ms': round(ms, 3), 'linhas': linhas,
+                                   'bytes': bytes_, 'erro': erro, 'detalhe': detalhe})
+
+    # Erro tratado (mostrado na tela ou repetido depois) que não passou por medir()
+    def registrar_erro(self, etapa, e):
+        self.registrar(etapa, 0.0, erro=f"{type(e).__name__}: {str(e)[:300]}")
+
+    def limpar(self):
+        with self._lock: self._medicoes.clear()
+
+    def medicoes(self):
+        with self._lock: dados = list(self._medicoes)
+        df = pd.DataFrame(dados, columns=['quando', 'etapa', 'ms', 'linhas', 'bytes', 'erro', 'detalhe'])
+        df['quando'] = pd.to_datetime(df['quando'], unit='s')
+        return df
+
+    def resumo(self):
+        df = self.medicoes()
+        if df.empty: return pd.DataFrame(columns=['Etapa', 'Chamadas', 'Total_ms', 'Media_ms', 'P95_ms', 'Max_ms', 'Linhas', 'Bytes', 'Erros'])
+        g = df.groupby('etapa', sort=False)
+        res = pd.DataFrame({
+            'Chamadas': g.size(), 'Total_ms': g['ms'].sum(), 'Media_ms': g['ms'].mean(), 'P95_ms': g['ms'].quantile(0.95),
+            'Max_ms': g['ms'].max(), 'Linhas': g['linhas'].sum(min_count=1), 'Bytes': g['bytes'].sum(min_count=1),
+            'Erros': g['erro'].count(),
+        }).round(1).rename_axis('Etapa').reset_index()
+        return res.sort_values('Total_ms', ascending=False)
+
+    def para_csv(self):
+        return self.medicoes().to_csv(index=False).encode('utf-8')
+
+    def para_json(self):
+        med = self.medicoes()
+        med['quando'] = med['quando'].astype(str)
+        registros = lambda df: df.astype(object).where(df.notna(), None).to_dict('records')
+        return json.dumps({'host': socket.gethostname(), 'inicio_processo': INICIO_PROCESSO, 'gerado_em': time.time(),
+                           'resumo': registros(self.resumo()), 'medicoes': registros(med)},
+                          ensure_ascii=False, default=str).encode('utf-8')
+
+
+DIAG = Diagnostico()
+
+
+@contextmanager
+def medir(etapa, detalhe=None):
+    m = Medicao(detalhe)
+    t0, erro = time.perf_counter(), None
+    try:
+        yield m
+    except Exception as e:
+        erro = f"{type(e).__name__}: {str(e)[:300]}"
+        raise
+    finally:
+        DIAG.registrar(etapa, (time.perf_counter() - t0) * 1000, m.linhas, m.bytes, erro, m.detalhe)
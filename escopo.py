@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import pandas as pd
+import streamlit as st
+
+from permissoes import chave_permissoes
+
+# --- RECORTE DAS BASES PELAS PERMISSÕES ---
+# Treinamentos e perguntas dentro das filiais/padrões do usuário e as opções dos
+# filtros (multiselects), montados uma vez por (versão das bases, recorte).
+# Quem tem o mesmo recorte (todos os gestores, auditores com a mesma lista) usa o
+# mesmo objeto; uma versão nova das bases gera chaves novas e as velhas saem pelo LRU.
+MAX_ESCOPOS = 32
+
+
+class Escopo(NamedTuple):
+    treinos: pd.DataFrame     # linhas de treinamento nas filiais e padrões permitidos
+    perguntas: pd.DataFrame   # perguntas dos padrões permitidos
+    filiais: list             # opções do filtro de filiais (ordenadas)
+    padroes: list             # opções do filtro de padrões (ordenadas)
+
+
+def montar_escopo(b, chave):
+    fils_ok, pads_ok = chave
+    c_fil, c_pad_tr, c_pad_pg = b.esq_treinos.filial, b.esq_treinos.padrao, b.esq_perguntas.padrao
+    filiais = sorted(b.treinos[c_fil].dropna().unique())
+    if fils_ok is not None: filiais = [f for f in filiais if f.strip() in fils_ok]
+    padroes = sorted(b.perguntas[c_pad_pg].dropna().unique())
+    if pads_ok is not None: padroes = [p for p in padroes if str(p).strip() in pads_ok]
+
+    treinos, perguntas = b.treinos, b.perguntas
+    if fils_ok is not None: treinos = treinos[treinos[c_fil].isin(filiais)]
+    if pads_ok is not None:
+        treinos = treinos[treinos[c_pad_tr].isin(padroes)]
+        perguntas = perguntas[perguntas[c_pad_pg].isin(padroes)]
+    return Escopo(treinos, perguntas, filiais, padroes)
+
+
+class CacheEscopos:
+    def __init__(self, maximo=MAX_ESCOPOS):
+        self._max = maximo
+        self._escopos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, b, perms):
+        chave = chave_permissoes(perms)
+        k = (b.versao, chave)
+        with self._lock:
+            if k in self._escopos:
+                self._escopos.move_to_end(k)
+                return self._escopos[k]
+        esc = montar_escopo(b, chave)
+        with self._lock:
+            self._escopos[k] = esc
+            while len(self._escopos) > self._max: self._escopos.popitem(last=False)
+        return esc
+
+
+@st.cache_resource(show_spinner=False)
+def obter_escopos():
+    return CacheEscopos()
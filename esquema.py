@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Optional
+
+# --- ESQUEMA DAS BASES ---
+# As colunas de cada base são localizadas uma única vez por carga (por trecho do
+# nome, como o achar_coluna sempre fez) e ficam guardadas num Esquema. O resto do
+# app usa esq.cpf, esq.padrao... em vez de procurar a coluna a cada uso.
+
+
+def achar_coluna(df, termo):
+    for col in df.columns:
+        if termo.lower() in col.lower(): return col
+    return None
+
+
+def _achar(df, *termos):
+    for t in termos:
+        col = achar_coluna(df, t)
+        if col: return col
+    return None
+
+
+@dataclass(frozen=True)
+class Esquema:
+    filial: Optional[str] = None
+    cpf: Optional[str] = None
+    padrao: Optional[str] = None
+    pergunta: Optional[str] = None
+    nome: Optional[str] = None
+    perfil: Optional[str] = None
+    resultado: Optional[str] = None
+    auditor_nome: Optional[str] = None
+
+
+def esquema_treinos(df):
+    return Esquema(filial=_achar(df, 'filial'), cpf=_achar(df, 'cpf'), padrao=_achar(df, 'padrao', 'codigo'),
+                   nome=_achar(df, 'nome'))
+
+
+def esquema_perguntas(df):
+    return Esquema(padrao=_achar(df, 'padrao', 'codigo'), pergunta=_achar(df, 'pergunta'), nome=_achar(df, 'nome'))
+
+
+# No cadastro, filial/padrao são as listas de permissão ("SP01, SP02" ou "Todas")
+def esquema_auditores(df):
+    return Esquema(filial=_achar(df, 'filiais', 'filia'), cpf=_achar(df, 'cpf'), padrao=_achar(df, 'padroes', 'padrao'),
+                   nome=_achar(df, 'nome'), perfil=_achar(df, 'perfil'))
+
+
+# A Respostas_DB é escrita pelo próprio app, então os nomes são fixos
+# Submissao_ID identifica o envio (repetir o mesmo envio não duplica) e Carimbo
+# (µs, crescente) decide qual resposta vale; as duas vão no fim para não mexer
+# nas colunas que já existiam.
+COLUNAS_RESPOSTAS = ["Data", "Filial", "Funcionario", "CPF", "Padrao", "Pergunta", "Resultado", "Observacao",
+                     "Auditor_Nome", "Auditor_CPF", "Submissao_ID", "Carimbo"]
+# Gravadas com USER_ENTERED, o Sheets transforma "1792319498456068" em número (só
+# 15 dígitos significativos; a leitura devolve "1.79232E+15"). O apóstrofo na frente
+# força texto e não faz parte do valor lido.
+COLUNAS_TEXTO = ("Submissao_ID", "Carimbo")
+
+
+def linhas_como_texto(linhas, cabecalho):
+    pos = [i for i, c in enumerate(cabecalho) if c in COLUNAS_TEXTO]
+    saida = []
+    for l in linhas:
+        l = list(l)
+        for i in pos:
+            if i < len(l) and str(l[i]) != '': l[i] = "'" + str(l[i])
+        saida.append(l)
+    return saida
+
+
+ESQUEMA_RESPOSTAS = Esquema(filial='Filial', cpf='CPF', padrao='Padrao', pergunta='Pergunta', nome='Funcionario',
+                            resultado='Resultado', auditor_nome='Auditor_Nome')
+
+
+def limpar_serie(s):
+    return s.astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+
+
+# Uma passada vetorizada nas colunas-chave; as de poucos valores viram categoria
+def normalizar(df, esq, papeis=('filial', 'cpf', 'padrao', 'pergunta'), categorias=('filial', 'padrao')):
+    for papel in papeis:
+        col = getattr(esq, papel)
+        if col and col in df.columns: df[col] = limpar_serie(df[col])
+    for papel in categorias:
+        col = getattr(esq, papel)
+        if col and col in df.columns: df[col] = df[col].astype('category')
+    return df
+
+
+def tipar_respostas(df):
+    for col in ('Filial', 'Padrao', 'Resultado', 'Auditor_Nome'):
+        if col in df.columns: df[col] = df[col].astype('category')
+    return df
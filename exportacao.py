@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+import xlsxwriter
+
+from diagnostico import medir
+
+# --- EXPORTAÇÕES EM EXCEL ---
+# Os arquivos só são gerados quando alguém clica em baixar (o download_button
+# recebe uma função) e ficam guardados pela versão dos dados + filtro, então o
+# segundo clique com os mesmos dados não gera de novo. A escrita é linha a linha
+# no modo constant_memory do xlsxwriter: cada linha vai para o disco assim que é
+# escrita, em vez de a planilha inteira ficar montada na memória.
+MAX_ARQUIVOS = 16
+
+
+def _escrever_aba(ws, df, negrito):
+    ws.write_row(0, 0, [str(c) for c in df.columns], negrito)
+    colunas = [df[c].astype(object).to_numpy() for c in df.columns]
+    for i, linha in enumerate(zip(*colunas), start=1):
+        for j, v in enumerate(linha):
+            if v is None or v is pd.NA or (isinstance(v, float) and v != v): continue
+            if isinstance(v, str): ws.write_string(i, j, v)   # nada de fórmula vinda de texto
+            elif isinstance(v, bool): ws.write_boolean(i, j, v)
+            elif isinstance(v, (int, float)): ws.write_number(i, j, v)
+            else: ws.write_string(i, j, str(v))
+
+
+# abas = [(nome, DataFrame), ...] na ordem em que aparecem no arquivo
+def planilha_excel(abas):
+    with medir('exportar.excel') as m:
+        out = BytesIO()
+        wb = xlsxwriter.Workbook(out, {'constant_memory': True})
+        negrito = wb.add_format({'bold': True})
+        for nome, df in abas: _escrever_aba(wb.add_worksheet(str(nome)[:31]), df, negrito)
+        wb.close()
+        m.linhas, m.bytes = sum(len(df) for _, df in abas), out.tell()
+        return out.getvalue()
+
+
+class CacheExportacoes:
+    def __init__(self, maximo=MAX_ARQUIVOS):
+        self._max = maximo
+        self._arquivos = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Devolve os bytes da chave; gera com montar() -> abas só na primeira vez
+    def obter(self, chave, montar):
+        with self._lock:
+            if chave in self._arquivos:
+                self._arquivos.move_to_end(chave)
+                return self._arquivos[chave]
+        dados = planilha_excel(montar())
+        with self._lock:
+            self._arquivos[chave] = dados
+            while len(self._arquivos) > self._max: self._arquivos.popitem(last=False)
+        return dados
+
+    # Função sem argumentos para o data= do download_button
+    def adiado(self, chave, montar):
+        return lambda: self.obter(chave, montar)
+
+
+@st.cache_resource(show_spinner=False)
+def obter_exportacoes():
+    return CacheExportacoes()
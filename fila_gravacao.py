@@ -0,0 +1,131 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from armazenamento import obter_armazenamento
+from diagnostico import DIAG
+from esquema import COLUNAS_RESPOSTAS
+from respostas import obter_respostas
+
+# --- FILA DE GRAVAÇÃO (WRITE-BEHIND) ---
+# O salvamento só grava o envio num arquivo SQLite local e volta na hora.
+# Uma thread por processo junta os envios de todas as sessões em lotes de
+# append_rows e tenta de novo com espera crescente. O que não foi gravado
+# continua no arquivo e sobe depois de um reinício. O id do envio é o Submissao_ID
+# das linhas: reenfileirar o mesmo envio é ignorado, e um envio que a sincronia
+# já encontrou no armazenamento é dado por gravado sem novo append.
+ARQUIVO_FILA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fila_respostas.db")
+LOTE_MAX = 500          # linhas por append_rows
+ESPERA_LOTE = 1.0       # s juntando envios antes de descarregar
+ESPERA_OCIOSA = 30.0    # s entre varreduras sem envio novo
+ESPERA_MAX = 120.0      # teto da espera entre tentativas
+GUARDAR_GRAVADOS = 24 * 3600
+
+
+class FilaGravacao:
+    def __init__(self, caminho, gravar, ja_gravados=None):
+        self._gravar = gravar
+        self._ja_gravados = ja_gravados
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._falhas = 0
+        self._con = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=FULL")
+        self._con.execute("""CREATE TABLE IF NOT EXISTS envios (
+            id TEXT PRIMARY KEY, criado REAL, linhas TEXT, status TEXT,
+            tentativas INTEGER DEFAULT 0, erro TEXT, gravado REAL)""")
+        self._con.execute("CREATE INDEX IF NOT EXISTS ix_envios_status ON envios (status, criado)")
+        self._thread = threading.Thread(target=self._loop, name="fila-gravacao", daemon=True)
+        self._thread.start()
+
+    def _sql(self, sql, params=()):
+        with self._lock:
+            return self._con.execute(sql, params).fetchall()
+
+    # False quando o id já estava na fila: o envio repetido é ignorado
+    def enfileirar(self, linhas, id_envio):
+        with self._lock:
+            novo = self._con.execute("INSERT OR IGNORE INTO envios (id, criado, linhas, status) VALUES (?, ?, ?, 'pendente')",
+                                     (id_envio, time.time(), json.dumps(linhas, ensure_ascii=False))).rowcount > 0
+        self._evento.set()
+        return novo
+
+    def status(self, ids):
+        ids = list(ids)
+        if not ids: return {}
+        q = ",".join("?" * len(ids))
+        return {i: {'status': s, 'tentativas': t, 'erro': e}
+                for i, s, t, e in self._sql(f"SELECT id, status, tentativas, erro FROM envios WHERE id IN ({q})", ids)}
+
+    # Linhas dos envios ainda não gravados, como registros (para reaplicar após recarga)
+    def registros_pendentes(self):
+        return [dict(zip(COLUNAS_RESPOSTAS, l)) for (js,) in self._sql("SELECT linhas FROM envios WHERE status = 'pendente' ORDER BY criado")
+                for l in json.loads(js)]
+
+    def pendentes(self):
+        return self._sql("SELECT COUNT(*) FROM envios WHERE status = 'pendente'")[0][0]
+
+    # Nenhum erro pode matar a thread (ex.: "database is locked" no SQLite, com
+    # vários processos no mesmo arquivo): registra, espera e tenta de novo.
+    def _loop(self):
+        while True:
+            try:
+                self._evento.wait(timeout=ESPERA_OCIOSA)
+                time.sleep(ESPERA_LOTE)
+                self._evento.clear()
+                while self._descarregar(): pass
+            except Exception as e:
+                DIAG.registrar_erro('fila.loop', e)
+                self._falhas += 1
+                time.sleep(min(ESPERA_MAX, 2 ** self._falhas) * random.uniform(0.5, 1.0))
+                self._evento.set()
+
+    # Grava um lote. Devolve True enquanto houver trabalho (inclusive após falha).
+    def _descarregar(self):
+        pend = self._sql("SELECT id, linhas, criado FROM envios WHERE status = 'pendente' ORDER BY criado")
+        if self._ja_gravados and pend:
+            feitos = set(self._ja_gravados([i for i, _, _ in pend]))
+            if feitos:
+                q = ",".join("?" * len(feitos))
+                self._sql(f"UPDATE envios SET status = 'gravado', gravado = ?, erro = NULL WHERE id IN ({q})", [time.time()] + list(feitos))
+                pend = [(i, js, c) for i, js, c in pend if i not in feitos]
+        ids, linhas = [], []
+        for i, js, _ in pend:
+            l = json.loads(js)
+            if linhas and len(linhas) + len(l) > LOTE_MAX: break
+            ids.append(i)
+            linhas.extend(l)
+        if not ids: return False
+
+        q = ",".join("?" * len(ids))
+        t0 = time.perf_counter()
+        try:
+            self._gravar(linhas)
+        except Exception as e:
+            DIAG.registrar_erro('fila.gravar', e)
+            self._falhas += 1
+            self._sql(f"UPDATE envios SET tentativas = tentativas + 1, erro = ? WHERE id IN ({q})", [str(e)[:300]] + ids)
+            time.sleep(min(ESPERA_MAX, 2 ** self._falhas) * random.uniform(0.5, 1.0))
+            return True
+
+        self._falhas = 0
+        agora = time.time()
+        DIAG.registrar('fila.gravar', (time.perf_counter() - t0) * 1000, len(linhas))
+        DIAG.registrar('fila.espera', (agora - pend[0][2]) * 1000, len(ids))   # idade do envio mais antigo do lote
+        self._sql(f"UPDATE envios SET status = 'gravado', gravado = ?, erro = NULL WHERE id IN ({q})", [agora] + ids)
+        self._sql("DELETE FROM envios WHERE status = 'gravado' AND gravado < ?", (agora - GUARDAR_GRAVADOS,))
+        return True
+
+
+@st.cache_resource(show_spinner=False)
+def obter_fila():
+    respostas = obter_respostas()
+    fila = FilaGravacao(ARQUIVO_FILA, obter_armazenamento().gravar, respostas.ja_gravadas)
+    respostas.pendentes = fila.registros_pendentes
+    return fila
@@ -0,0 +1,151 @@
+import csv
+import hashlib
+import json
+import os
+import zipfile
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from esquema import COLUNAS_RESPOSTAS, limpar_serie
+from fila_gravacao import LOTE_MAX
+from respostas import novo_carimbo
+
+# --- IMPORTAÇÃO EM LOTE (backup / planilha offline) ---
+# Lê o arquivo em blocos (CSV com chunksize, Excel em modo read_only), valida cada
+# bloco de uma vez contra o índice de perguntas e a base de treinamentos e devolve
+# as linhas aceitas no formato da Respostas_DB. Cada lote enviado à fila tem id
+# derivado do conteúdo: importar o mesmo arquivo de novo não duplica o envio.
+TAMANHO_BLOCO = 5000
+OBRIGATORIAS = ("CPF", "Padrao", "Pergunta", "Resultado")
+RESULTADOS = ("Conforme", "Não Conforme", "Não se Aplica")
+# Arquivo corrompido, renomeado ou em outro formato (KeyError: .xlsx sem as partes do Excel)
+ERROS_LEITURA = (zipfile.BadZipFile, InvalidFileException, KeyError, pd.errors.ParserError, pd.errors.EmptyDataError,
+                 UnicodeDecodeError, csv.Error)
+
+
+def _bloco_df(cab, linhas):
+    return pd.DataFrame(linhas, columns=cab).astype(str).replace({'None': '', 'nan': ''})
+
+
+def ler_blocos(arquivo, nome, tamanho=TAMANHO_BLOCO):
+    try:
+        yield from _ler_blocos(arquivo, nome, tamanho)
+    except ERROS_LEITURA as e:
+        raise ValueError(f"Não foi possível ler {nome}: {type(e).__name__}: {e}") from e
+
+
+def _ler_blocos(arquivo, nome, tamanho):
+    if os.path.splitext(nome)[1].lower() == ".csv":
+        for bloco in pd.read_csv(arquivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig",
+                                 keep_default_na=False, chunksize=tamanho):
+            yield bloco
+        return
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cab = [str(c).strip() if c is not None else '' for c in next(linhas, ())]
+        buf = []
+        for l in linhas:
+            buf.append(list(l[:len(cab)]) + [None] * (len(cab) - len(l)))
+            if len(buf) == tamanho:
+                yield _bloco_df(cab, buf)
+                buf = []
+        if buf: yield _bloco_df(cab, buf)
+    finally:
+        wb.close()
+
+
+# Nomes de coluna do arquivo -> nomes da Respostas_DB (sem diferenciar maiúsculas)
+def _renomear(df):
+    oficiais = {c.lower(): c for c in COLUNAS_RESPOSTAS}
+    return df.rename(columns={c: oficiais[str(c).strip().lower()] for c in df.columns if str(c).strip().lower() in oficiais})
+
+
+class ValidadorImportacao:
+    def __init__(self, idx_perg, df_t, esq_t, auditor, perms, hora):
+        self._pares = pd.MultiIndex.from_tuples([(p, str(t).strip()) for p, l in idx_perg.por_padrao.items() for _, t in l]
+                                                or [('', '')])
+        self._pads = pd.Index(list(idx_perg.por_padrao))
+        pessoas = df_t.drop_duplicates(esq_t.cpf)
+        self._cpfs = pd.Index(pessoas[esq_t.cpf].astype(str))
+        self._fil = pd.Series(pessoas[esq_t.filial].astype(str).to_numpy(), index=self._cpfs)
+        self._nome = pd.Series(pessoas[esq_t.nome].astype(str).to_numpy(), index=self._cpfs) if esq_t.nome else None
+        self._auditor, self._hora = auditor or {}, hora
+        self._carimbo = novo_carimbo()
+        self._fils_ok = None if perms['filiais'] == 'TODAS' else {str(x).strip() for x in perms['filiais']}
+        self._pads_ok = None if perms['padroes'] == 'TODOS' else {str(x).strip() for x in perms['padroes']}
+
+    # Devolve (aceitas, rejeitadas); primeira_linha é o número da linha no arquivo
+    def validar(self, bloco, primeira_linha=2):
+        df = _renomear(bloco).reset_index(drop=True)
+        faltam = [c for c in OBRIGATORIAS if c not in df.columns]
+        if faltam: raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltam)}")
+        for c in COLUNAS_RESPOSTAS:
+            df[c] = limpar_serie(df[c]) if c in df.columns else ''
+        df = df[COLUNAS_RESPOSTAS]
+        df = df[(df != '').any(axis=1)]
+
+        # A filial vem sempre da base de treinamentos (a do arquivo só é conferida), para
+        # a permissão e o painel valerem sobre a filial onde a pessoa foi treinada
+        fil_treino = df['CPF'].map(self._fil).fillna('')
+        fil_errada = (df['Filial'] != '') & (df['Filial'] != fil_treino)
+        df['Filial'] = fil_treino
+        # Campos vazios que a base de treinamentos / o login preenchem
+        if self._nome is not None: df['Funcionario'] = df['Funcionario'].mask(df['Funcionario'] == '', df['CPF'].map(self._nome)).fillna('')
+        df['Data'] = df['Data'].mask(df['Data'] == '', self._hora)
+        df['Auditor_Nome'] = df['Auditor_Nome'].mask(df['Auditor_Nome'] == '', self._auditor.get('Nome', ''))
+        df['Auditor_CPF'] = df['Auditor_CPF'].mask(df['Auditor_CPF'] == '', self._auditor.get('CPF', ''))
+        # Backup de um envio que falhou já traz o Carimbo original; o resto recebe o da importação
+        df['Carimbo'] = df['Carimbo'].where(df['Carimbo'].str.isdigit(), self._carimbo)
+
+        regras = [
+            (~df['CPF'].isin(self._cpfs), "CPF fora da Base_Treinamentos"),
+            (fil_errada, "Filial diferente da Base_Treinamentos"),
+            (~df['Padrao'].isin(self._pads), "Padrão desconhecido"),
+            (~pd.MultiIndex.from_arrays([df['Padrao'], df['Pergunta']]).isin(self._pares), "Pergunta não pertence ao padrão"),
+            (~df['Resultado'].isin(RESULTADOS), "Resultado inválido"),
+            ((df['Resultado'] == "Não Conforme") & (df['Observacao'] == ''), "Não Conforme sem observação"),
+        ]
+        if self._fils_ok is not None: regras.append((~df['Filial'].isin(self._fils_ok), "Filial fora das suas permissões"))
+        if self._pads_ok is not None: regras.append((~df['Padrao'].isin(self._pads_ok), "Padrão fora das suas permissões"))
+
+        motivo = pd.Series('', index=df.index)
+        for mask, texto in reversed(regras):   # fica o primeiro motivo da lista
+            motivo = motivo.mask(pd.Series(mask, index=df.index), texto)
+        ruim = motivo != ''
+        rejeitadas = df[ruim].assign(Linha=df.index[ruim] + primeira_linha, Motivo=motivo[ruim])
+        return df[~ruim], rejeitadas[['Linha', 'Motivo'] + COLUNAS_RESPOSTAS]
+
+
+# Lotes do tamanho do append da fila, com id pelo conteúdo (idempotente). O id
+# vira o Submissao_ID das linhas; o hash não inclui Data, id nem Carimbo, que
+# podem ser preenchidos de novo a cada importação do mesmo arquivo.
+def lotes_idempotentes(aceitas):
+    conteudo = [c for c in COLUNAS_RESPOSTAS if c not in ('Data', 'Submissao_ID', 'Carimbo')]
+    for i in range(0, len(aceitas), LOTE_MAX):
+        lote = aceitas.iloc[i:i + LOTE_MAX]
+        id_envio = "imp-" + hashlib.sha256(json.dumps(lote[conteudo].to_numpy().tolist(), ensure_ascii=False).encode()).hexdigest()[:24]
+        yield id_envio, lote.assign(Submissao_ID=id_envio)[COLUNAS_RESPOSTAS].to_dict('records')
+
+
+# Lê, valida e entrega: enfileirar(linhas, id_envio) manda para o armazenamento e
+# devolve False para um lote que já estava na fila (arquivo importado de novo);
+# só os lotes novos passam por registrar(registros), que atualiza a tabela de
+# respostas. Um lote repetido não sobrescreve na memória uma correção feita depois.
+# envios = [(id, linhas)]
+def importar(arquivo, nome, validador, registrar, enfileirar, tamanho=TAMANHO_BLOCO):
+    total, aceitas, rejeitadas, ids = 0, 0, [], []
+    for bloco in ler_blocos(arquivo, nome, tamanho):
+        ok, ruins = validador.validar(bloco, primeira_linha=total + 2)
+        total += len(bloco)
+        rejeitadas.append(ruins)
+        if ok.empty: continue
+        ok = ok.drop_duplicates(['CPF', 'Padrao', 'Pergunta'], keep='last')
+        for id_envio, regs in lotes_idempotentes(ok):
+            if enfileirar([[r[c] for c in COLUNAS_RESPOSTAS] for r in regs], id_envio): registrar(regs)
+            ids.append((id_envio, len(regs)))
+        aceitas += len(ok)
+    rej = pd.concat(rejeitadas, ignore_index=True) if rejeitadas else pd.DataFrame(columns=['Linha', 'Motivo'] + COLUNAS_RESPOSTAS)
+    return {'linhas': total, 'aceitas': aceitas, 'rejeitadas': rej, 'envios': ids}
@@ -0,0 +1,29 @@
+import pandas as pd
+
+# --- ÍNDICES PARA O FORMULÁRIO DE EXECUÇÃO ---
+
+
+# Perguntas agrupadas por padrão, na ordem da planilha. O id de cada pergunta é o
+# índice da linha em Padroes_Perguntas (é ele que vai na chave dos widgets).
+class IndicePerguntas:
+    def __init__(self, df_p, esq):
+        pads = df_p[esq.padrao].astype(str).str.strip()
+        textos = df_p[esq.pergunta] if esq.pergunta else pd.Series('', index=df_p.index)
+        self.texto = dict(zip(df_p.index, textos))
+        self.por_padrao = {}
+        for qid, p in zip(df_p.index, pads):
+            self.por_padrao.setdefault(p, []).append((qid, self.texto[qid]))
+        self.nomes = {}
+        if esq.nome:
+            tn = pd.DataFrame({'p': pads, 'n': df_p[esq.nome]}).drop_duplicates()
+            self.nomes = dict(zip(tn['p'], tn['n']))
+
+    def perguntas(self, padrao):
+        return self.por_padrao.get(str(padrao).strip(), [])
+
+
+# CPF -> padrões da pessoa dentro do filtro atual (sem repetição, na ordem da base)
+def padroes_por_cpf(df_m, esq):
+    par = pd.DataFrame({'cpf': df_m[esq.cpf].astype(str).str.strip().to_numpy(),
+                        'pad': df_m[esq.padrao].astype(str).str.strip().to_numpy()}).drop_duplicates()
+    return par.groupby('cpf', sort=False)['pad'].agg(list).to_dict()
@@ -0,0 +1,130 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# --- CÁLCULOS DO PAINEL GERENCIAL ---
+# Tudo em groupby/merge, sem laço por pessoa ou padrão; as visões do painel saem
+# de recortes do cubo de progresso.
+# Mantém exatamente as regras da versão em laço (status, metas e percentuais).
+PENDENTE, PARCIAL, CONCLUIDO = "🔴 Pendente", "🟡 Parcial", "🟢 Concluído"
+
+
+def _meta_do_padrao(serie, metas):
+    return serie.astype(str).map(metas).fillna(0).astype(int)
+
+
+def _pct(real, meta):
+    # int(real/meta*100) do laço original, inclusive no arredondamento do float
+    return np.where(meta > 0, (real / meta.where(meta > 0, 1) * 100), 0).astype(int)
+
+
+# --- CUBO DE PROGRESSO ---
+# Uma linha por (filial, padrão, CPF) dos treinamentos, na ordem em que aparecem,
+# com nome, quantidade de linhas de treinamento e meta do padrão. É montado uma vez
+# por versão das bases; o lado respondido vem da ContagemRespostas, mantida a cada
+# upsert. Filtrar o painel é juntar as células (filial, padrão) escolhidas.
+class FatiaProgresso(NamedTuple):
+    tabela: pd.DataFrame   # linhas do cubo no recorte (fil, pad, cpf, nome, linhas, meta)
+    por_cpf: dict          # respostas por CPF no recorte
+    por_cpf_pad: dict      # respostas por (CPF, padrão) no recorte
+    por_auditor: dict      # respostas por auditor no recorte
+
+
+class CuboProgresso:
+    def __init__(self, df_t, esq, metas):
+        tr = pd.DataFrame({'fil': df_t[esq.filial].astype(str).to_numpy(), 'pad': df_t[esq.padrao].astype(str).to_numpy(),
+                           'cpf': df_t[esq.cpf].astype(str).to_numpy(), 'nome': df_t[esq.nome].to_numpy()})
+        linhas = tr.groupby(['fil', 'pad', 'cpf'], sort=False).size()
+        t = tr.drop_duplicates(['fil', 'pad', 'cpf']).reset_index(drop=True)
+        t['linhas'] = linhas.to_numpy()   # groupby sem ordenar segue a 1ª aparição, igual ao drop_duplicates
+        t['meta'] = _meta_do_padrao(t['pad'], metas)
+        self.tabela = t
+        self._celulas = t.groupby(['fil', 'pad'], sort=False).indices
+
+    def fatia(self, filiais, padroes, contagem):
+        chaves = [(str(f), str(p)) for f in filiais for p in padroes]
+        pos = [self._celulas[k] for k in chaves if k in self._celulas]
+        idx = np.sort(np.concatenate(pos)) if pos else np.array([], dtype=int)
+        return FatiaProgresso(self.tabela.iloc[idx], *contagem.somar(chaves))
+
+
+def status_por_pessoa(fatia):
+    t = fatia.tabela
+    # Meta da pessoa = soma das metas dos padrões distintos dela
+    meta = t.drop_duplicates(['cpf', 'pad']).groupby('cpf', sort=False)['meta'].sum()
+    # Filial/Nome da primeira linha de cada pessoa, na ordem em que aparecem
+    info = t.drop_duplicates('cpf')
+    meta = meta.reindex(info['cpf'].to_numpy()).fillna(0).astype(int).to_numpy()
+    real = info['cpf'].map(fatia.por_cpf).fillna(0).astype(int).to_numpy()
+
+    status = np.select([real == 0, (real >= meta) & (meta > 0)], [PENDENTE, CONCLUIDO], PARCIAL)
+    pct = _pct(pd.Series(real), pd.Series(meta))
+    prog = [f"{r}/{m} ({p}%)" for r, m, p in zip(real, meta, pct)]
+    df_d = pd.DataFrame({"Filial": info['fil'].to_numpy(), "Nome": info['nome'].to_numpy(), "Status": status, "Prog": prog})
+    counts = {'P': int((status == PENDENTE).sum()), 'A': int((status == PARCIAL).sum()), 'C': int((status == CONCLUIDO).sum())}
+    return df_d, counts
+
+
+# Cada linha de treinamento (CPF, padrão) é uma unidade de volume; as linhas
+# repetidas de uma mesma célula do cubo entram com o peso 'linhas'.
+def volumetria_por_padrao(fatia, mapa_nomes):
+    t = fatia.tabela
+    chave = pd.MultiIndex.from_arrays([t['cpf'].to_numpy(), t['pad'].to_numpy()])
+    rv = pd.Series(fatia.por_cpf_pad, dtype=float).reindex(chave).fillna(0).astype(int).to_numpy() \
+        if fatia.por_cpf_pad else np.zeros(len(t), dtype=int)
+    meta, peso = t['meta'].to_numpy(), t['linhas'].to_numpy()
+    ok = (rv >= meta) & (meta > 0)
+    zero = rv == 0
+    counts_v = {'Z': int(peso[zero].sum()), 'C': int(peso[ok].sum()), 'I': int(peso[~zero & ~ok].sum())}
+
+    por_pad = pd.DataFrame({'pad': t['pad'].to_numpy(), 'Vol': peso, 'Ok': peso * ok}).groupby('pad', sort=False).sum()
+    df_v = pd.DataFrame({
+        "Padrão": por_pad.index.to_numpy(),
+        "Desc": [mapa_nomes.get(p, p) for p in por_pad.index],
+        "Vol": por_pad['Vol'].to_numpy(),
+        "Ok": por_pad['Ok'].astype(int).to_numpy(),
+    })
+    df_v["%"] = [f"{p}%" for p in _pct(df_v["Ok"], df_v["Vol"])]
+    return df_v, counts_v
+
+
+# Meta (em perguntas) de cada combinação filial × padrão presente nos treinamentos
+def matriz_metas(df_t, esq, metas):
+    g = df_t.groupby([esq.filial, esq.padrao], observed=True).size()
+    m = g * _meta_do_padrao(pd.Series(g.index.get_level_values(1)), metas).to_numpy()
+    return m[m > 0]
+
+
+# Meta de cada auditor = soma da matriz no recorte das permissões dele. Não depende
+# do filtro do painel: sai uma vez por versão das bases. Gestores ficam como None;
+# nomes fora do cadastro usam a meta total (sem restrição).
+class MetasAuditores(NamedTuple):
+    por_nome: dict   # nome -> meta (None = gestor, fora da tabela)
+    total: int
+
+
+def metas_por_auditor(perm_aud, matriz):
+    fils = matriz.index.get_level_values(0).astype(str)
+    pads = matriz.index.get_level_values(1).astype(str)
+    valores = matriz.to_numpy()
+    por_nome = {}
+    for nm, gestor, lf, lp in zip(perm_aud.index, perm_aud['Gestor'], perm_aud['Filiais'], perm_aud['Padroes']):
+        if gestor: por_nome[nm] = None; continue
+        mask = np.ones(len(valores), dtype=bool)
+        if lf is not None: mask &= fils.isin(lf)
+        if lp is not None: mask &= pads.isin(lp)
+        por_nome[nm] = int(valores[mask].sum())
+    return MetasAuditores(por_nome, int(valores.sum()))
+
+
+# Real = respostas do auditor no filtro do painel (real_por_auditor)
+def performance_auditores(nomes, metas, real_por_auditor):
+    linhas = []
+    for nm in nomes:
+        meta = metas.por_nome.get(nm, metas.total)
+        if meta is None: continue
+        real = int(real_por_auditor.get(nm, 0))
+        pct = int((real/meta)*100) if meta > 0 else 0
+        linhas.append({"Auditor": nm, "Meta": meta, "Real": real, "Pend": max(0, meta - real), "%": f"{pct}%"})
+    return pd.DataFrame(linhas, columns=["Auditor", "Meta", "Real", "Pend", "%"]).sort_values(by="Real", ascending=False)
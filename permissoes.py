@@ -0,0 +1,71 @@
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+# --- PERMISSÕES DO CADASTRO DE AUDITORES ---
+# As células trazem "Todas"/"Todos" ou uma lista separada por vírgula.
+# None significa sem restrição.
+
+
+def ler_permissao(valor, termo_todos):
+    raw = str(valor)
+    if termo_todos in raw.lower() or pd.isna(valor) or raw == 'nan': return None
+    return [x.strip() for x in raw.split(',')]
+
+
+# Chave das permissões de uma sessão: (filiais, padrões) como frozenset, None = todas.
+# Sessões com o mesmo recorte têm a mesma chave (e dividem os caches por recorte).
+def chave_permissoes(perms):
+    fils, pads = perms['filiais'], perms['padroes']
+    return (None if fils == 'TODAS' else frozenset(str(x).strip() for x in fils),
+            None if pads == 'TODOS' else frozenset(str(x).strip() for x in pads))
+
+
+class Auditor(NamedTuple):
+    nome: str
+    cpf: str
+    perfil: str
+    filiais: Optional[list]   # None = todas
+    padroes: Optional[list]   # None = todos
+
+    @property
+    def gestor(self): return 'gestor' in self.perfil.lower()
+
+    # O dicionário de permissões que fica na sessão após o login
+    def permissoes(self):
+        return {'filiais': self.filiais or 'TODAS', 'padroes': self.padroes or 'TODOS', 'perfil': self.perfil}
+
+
+# Cadastro lido uma vez por versão das bases: listas de permissão já separadas e
+# índice por CPF para o login (vale a primeira linha de cada CPF).
+class RegistroAuditores:
+    def __init__(self, df_a, esq):
+        self.auditores = []
+        self._por_cpf = {}
+        if df_a is None or not esq.cpf: return
+        col = lambda c, padrao: df_a[c].tolist() if c else [padrao] * len(df_a)
+        for nome, cpf, perfil, fils, pads in zip(col(esq.nome or esq.cpf, ''), df_a[esq.cpf].astype(str).str.strip(),
+                                                 col(esq.perfil, 'Auditor'), col(esq.filial, 'Todas'), col(esq.padrao, 'Todos')):
+            aud = Auditor(nome, cpf, str(perfil).strip(), ler_permissao(fils, 'todas'), ler_permissao(pads, 'todos'))
+            self.auditores.append(aud)
+            self._por_cpf.setdefault(cpf, aud)
+
+    def __len__(self): return len(self.auditores)
+
+    def obter(self, cpf):
+        return self._por_cpf.get(str(cpf).strip())
+
+    # Nomes na ordem do cadastro, sem repetição
+    @property
+    def nomes(self):
+        return list(dict.fromkeys(a.nome for a in self.auditores))
+
+
+# Uma linha por nome de auditor (a primeira do cadastro), já com as listas lidas
+def tabela_permissoes(registro):
+    vistos = {}
+    for a in registro.auditores: vistos.setdefault(a.nome, a)
+    auds = list(vistos.values())
+    return pd.DataFrame({'Perfil': [a.perfil for a in auds], 'Gestor': [a.gestor for a in auds],
+                         'Filiais': [a.filiais for a in auds], 'Padroes': [a.padroes for a in auds]},
+                        index=pd.Index([a.nome for a in auds], name='Nome'))
@@ -0,0 +1,270 @@
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+import streamlit as st
+
+from armazenamento import obter_armazenamento
+from diagnostico import medir
+from esquema import tipar_respostas
+from permissoes import chave_permissoes
+
+# --- BASE DE RESPOSTAS INDEXADA ---
+# Guarda uma resposta por (CPF, Padrao, Pergunta), com índices secundários por CPF
+# e por (CPF, Padrao). Vale a de Carimbo mais novo; sem Carimbo (linhas antigas),
+# a última gravada, como o drop_duplicates(keep='last') da nuvem.
+CHAVE = ('CPF', 'Padrao', 'Pergunta')
+_lock_carimbo = threading.Lock()
+_ultimo_carimbo = 0
+
+
+# Microssegundos desde a época, estritamente crescente dentro do processo
+def novo_carimbo():
+    global _ultimo_carimbo
+    with _lock_carimbo:
+        _ultimo_carimbo = max(time.time_ns() // 1000, _ultimo_carimbo + 1)
+        return str(_ultimo_carimbo)
+
+
+# Só dígitos: "1.79232E+15" (Carimbo que o Sheets guardou como número) vale como sem Carimbo
+def carimbo_de(reg):
+    c = _campo(reg, 'Carimbo')
+    return int(c) if c.isdigit() else 0
+
+
+def _campo(reg, nome):
+    return str(reg.get(nome, reg.get(nome.lower(), ''))).strip()
+
+
+def chave_de(reg):
+    return tuple(_campo(reg, c) for c in CHAVE)
+
+
+class BaseRespostas:
+    def __init__(self, registros=None):
+        self._dados = {}          # (cpf, padrao, pergunta) -> registro
+        self._por_cpf = {}        # cpf -> {(padrao, pergunta)}
+        self._por_cpf_pad = {}    # (cpf, padrao) -> {pergunta}
+        if registros is not None: self.upsert_varios(registros)
+
+    def __len__(self): return len(self._dados)
+
+    def __iter__(self): return iter(self._dados.values())
+
+    def limpar(self):
+        self._dados.clear()
+        self._por_cpf.clear()
+        self._por_cpf_pad.clear()
+
+    # Grava (ou substitui) a resposta. Devolve o registro anterior, se havia. Se o
+    # guardado tem Carimbo mais novo, nada muda e volta o próprio reg.
+    def upsert(self, reg):
+        k = chave_de(reg)
+        cpf, pad, perg = k
+        anterior = self._dados.get(k)
+        if anterior is not None and carimbo_de(anterior) > carimbo_de(reg): return reg
+        # pop + set leva o registro para o fim, como o append depois do filtro fazia
+        self._dados.pop(k, None)
+        self._dados[k] = reg
+        if anterior is None:
+            self._por_cpf.setdefault(cpf, set()).add((pad, perg))
+            self._por_cpf_pad.setdefault((cpf, pad), set()).add(perg)
+        return anterior
+
+    def upsert_varios(self, registros):
+        for reg in registros: self.upsert(reg)
+
+    def obter(self, cpf, padrao, pergunta):
+        return self._dados.get((str(cpf).strip(), str(padrao).strip(), str(pergunta).strip()))
+
+    # Respostas de uma pessoa no formato do preenchimento do formulário
+    def preenchimento(self, cpf):
+        cpf = str(cpf).strip()
+        mem = {}
+        for pad, perg in self._por_cpf.get(cpf, ()):
+            r = self._dados[(cpf, pad, perg)]
+            mem[(pad, perg)] = {'res': r.get('Resultado'), 'obs': r.get('Observacao')}
+        return mem
+
+    def chaves(self, cpf):
+        return self._por_cpf.get(str(cpf).strip(), set())
+
+    def contar(self, cpf, padroes=None):
+        cpf = str(cpf).strip()
+        if padroes is None: return len(self._por_cpf.get(cpf, ()))
+        return sum(len(self._por_cpf_pad.get((cpf, str(p).strip()), ())) for p in set(padroes))
+
+    def registros(self):
+        return list(self._dados.values())
+
+    def to_df(self):
+        return pd.DataFrame(self.registros())
+
+
+# Contagem de respostas por (Filial, Padrao), separada por CPF e por auditor.
+# É o lado "respondido" do cubo de progresso do painel; acompanha cada upsert
+# (sai o registro anterior, entra o novo) em vez de ser recalculada.
+class ContagemRespostas:
+    def __init__(self):
+        self._por_cpf = {}   # (filial, padrao) -> Counter(cpf)
+        self._por_aud = {}   # (filial, padrao) -> Counter(auditor)
+
+    def limpar(self):
+        self._por_cpf.clear()
+        self._por_aud.clear()
+
+    def trocar(self, anterior, novo):
+        if anterior is not None: self._mover(anterior, -1)
+        self._mover(novo, 1)
+
+    def _mover(self, reg, delta):
+        k = (_campo(reg, 'Filial'), _campo(reg, 'Padrao'))
+        for tabela, valor in ((self._por_cpf, _campo(reg, 'CPF')), (self._por_aud, _campo(reg, 'Auditor_Nome'))):
+            c = tabela.setdefault(k, Counter())
+            c[valor] += delta
+            if c[valor] <= 0: del c[valor]
+
+    # Soma as células (filial, padrao) pedidas: custo proporcional ao recorte
+    def somar(self, chaves):
+        por_cpf, por_cpf_pad, por_aud = Counter(), Counter(), Counter()
+        for k in chaves:
+            c = self._por_cpf.get(k)
+            if c:
+                por_cpf.update(c)
+                for cpf, n in c.items(): por_cpf_pad[(cpf, k[1])] += n
+            a = self._por_aud.get(k)
+            if a: por_aud.update(a)
+        return por_cpf, por_cpf_pad, por_aud
+
+
+# --- TABELA ÚNICA POR PROCESSO ---
+# Todas as sessões leem a mesma BaseRespostas. A versão sobe a cada sincronia
+# com novidade e a cada salvamento, de modo que as outras sessões enxergam a
+# mudança no próximo rerun sem baixar nada.
+class RespostasCompartilhadas:
+    def __init__(self, sincronia):
+        self.base = BaseRespostas()
+        self.contagem = ContagemRespostas()
+        self.submissoes_gravadas = set()   # Submissao_ID já vistos no armazenamento
+        self.versao = 0
+        self.carregada = False   # já houve uma carga completa do armazenamento
+        self.lock = threading.RLock()
+        self._sinc = sincronia
+        self._lock_sinc = threading.Lock()
+        self._dfs = (None, {})   # (versao, {chave da visão: DataFrame})
+        self.pendentes = None    # () -> registros ainda na fila local (ligado pela fila)
+
+    # Só uma sessão busca por vez; as outras seguem com a tabela atual em vez de
+    # esperar (a busca pode demorar, com o Sheets devolvendo 429). forcar espera.
+    # Antes da primeira carga não há tabela com que seguir: as sessões esperam a
+    # carga em andamento (buscar já marca a sincronia como feita ao começar).
+    def sincronizar(self, forcar=False):
+        if not forcar and self.carregada and not self._sinc.vencida(): return
+        if not self._lock_sinc.acquire(blocking=forcar or not self.carregada): return
+        try:
+            if not forcar and not self._sinc.vencida(): return
+            regs, completo = self._sinc.buscar()
+            if not regs and not completo: return
+            # Recarga completa: o que ainda está na fila local volta por cima (o
+            # upsert fica com o Carimbo mais novo), senão some até ser gravado
+            locais = self.pendentes() if completo and self.pendentes else []
+            with self.lock:
+                if completo:
+                    self.base.limpar()
+                    self.contagem.limpar()
+                    self.submissoes_gravadas.clear()
+                self.submissoes_gravadas.update(_campo(r, 'Submissao_ID') for r in regs)
+                self.submissoes_gravadas.discard('')
+                self._upsert(regs)
+                if locais: self._upsert(locais)
+                if completo: self.carregada = True
+                self.versao += 1
+        finally:
+            self._lock_sinc.release()
+
+    def registrar(self, regs):
+        with self.lock:
+            self._upsert(regs)
+            self.versao += 1
+
+    def _upsert(self, regs):
+        with medir('respostas.dedup') as m:
+            m.linhas = len(regs)
+            for reg in regs:
+                anterior = self.base.upsert(reg)
+                if anterior is not reg: self.contagem.trocar(anterior, reg)
+
+    # O envio id_envio ainda é o que vale para todas as chaves de regs?
+    def envio_vigente(self, id_envio, regs):
+        with self.lock:
+            for r in regs:
+                atual = self.base._dados.get(chave_de(r))
+                if atual is None or _campo(atual, 'Submissao_ID') != id_envio: return False
+            return True
+
+    # Envios da fila que a sincronia já encontrou gravados (ex.: append que subiu
+    # mas caiu antes de ser marcado): a fila pode dá-los por gravados sem repetir
+    def ja_gravadas(self, ids):
+        with self.lock:
+            return self.submissoes_gravadas.intersection(ids)
+
+    def visao(self, perms):
+        return VisaoRespostas(self, perms)
+
+    def _df_visao(self, visao):
+        with self.lock:
+            versao, dfs = self._dfs
+            if versao != self.versao: dfs = {}; self._dfs = (self.versao, dfs)
+            if visao.chave not in dfs:
+                with medir('respostas.dataframe') as m:
+                    dfs[visao.chave] = tipar_respostas(pd.DataFrame([r for r in self.base if visao.permitido(r)]))
+                    m.linhas = len(dfs[visao.chave])
+            return dfs[visao.chave]
+
+
+# Recorte da tabela compartilhada pelas permissões do usuário (não copia dados)
+class VisaoRespostas:
+    def __init__(self, comp, perms):
+        self._comp = comp
+        self.chave = self._fils, self._pads = chave_permissoes(perms)
+
+    @property
+    def versao(self): return self._comp.versao
+
+    def permitido(self, reg):
+        return (self._fils is None or _campo(reg, 'Filial') in self._fils) and \
+               (self._pads is None or _campo(reg, 'Padrao') in self._pads)
+
+    def preenchimento(self, cpf):
+        base = self._comp.base
+        with self._comp.lock:
+            mem = base.preenchimento(cpf)
+            if self._fils is None and self._pads is None: return mem
+            return {k: v for k, v in mem.items() if self.permitido(base.obter(cpf, *k))}
+
+    def contar(self, cpf, padroes=None):
+        base = self._comp.base
+        if self._pads is not None:
+            padroes = [p for p in (padroes if padroes is not None else self._pads) if str(p).strip() in self._pads]
+        with self._comp.lock:
+            if self._fils is None: return base.contar(cpf, padroes)
+            pads = None if padroes is None else {str(p).strip() for p in padroes}
+            return sum(1 for (p, t) in base.chaves(cpf) if (pads is None or p in pads) and self.permitido(base.obter(cpf, p, t)))
+
+    # Nenhuma resposta no recorte? Olha só as células (filial, padrao) da contagem,
+    # sem montar o DataFrame
+    def vazia(self):
+        with self._comp.lock:
+            return not any(c and (self._fils is None or f in self._fils) and (self._pads is None or p in self._pads)
+                           for (f, p), c in self._comp.contagem._por_cpf.items())
+
+    def to_df(self):
+        return self._comp._df_visao(self)
+
+    def __len__(self): return len(self.to_df())
+
+
+@st.cache_resource(show_spinner=False)
+def obter_respostas():
+    return RespostasCompartilhadas(obter_armazenamento().sincronia())
@@ -0,0 +1,96 @@
+import time
+
+import gspread
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from diagnostico import medir
+
+# --- SINCRONIA INCREMENTAL DA Respostas_DB ---
+# A aba só cresce (append). Guardamos a última linha já lida e, a cada sincronia,
+# buscamos o cabeçalho e a faixa A{n}:... numa única chamada. A linha n volta junto
+# para conferir que nada acima dela mudou; se o cabeçalho mudou, a aba encolheu ou
+# a linha n não bate, recarregamos tudo.
+# Depois de uma compactação, o estado consolidado fica na aba Respostas_Snapshot
+# e a Respostas_DB guarda só a cauda; a recarga lê as duas.
+ABA_RESPOSTAS = "Respostas_DB"
+ABA_SNAPSHOT = "Respostas_Snapshot"
+INTERVALO_SINC = 30  # s entre sincronias automáticas
+
+
+def _ajustar(linha, n):
+    linha = [str(v) for v in linha[:n]]
+    return linha + [''] * (n - len(linha))
+
+
+def _cabecalho(linha):
+    cab = [str(c).strip() for c in linha]
+    while cab and not cab[-1]: cab.pop()
+    return cab
+
+
+def normalizar_linhas(linhas, cabecalho):
+    linhas = [l for l in linhas if any(str(v).strip() for v in l)]
+    if not linhas: return []
+    with medir('respostas.normalizar') as m:
+        m.linhas = len(linhas)
+        df = pd.DataFrame(linhas, columns=cabecalho)
+        for c in df.columns:
+            df[c] = df[c].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+        return df.to_dict('records')
+
+
+class SincroniaRespostas:
+    def __init__(self, pool, aba=ABA_RESPOSTAS, aba_snapshot=ABA_SNAPSHOT):
+        self._pool = pool
+        self._aba = aba
+        self._aba_snapshot = aba_snapshot
+        self.cabecalho = None
+        self.ultima_linha = 0       # linha da planilha já ingerida (1 = cabeçalho)
+        self._ultima_valores = None
+        self.quando = 0.0
+
+    def vencida(self):
+        return time.time() - self.quando > INTERVALO_SINC
+
+    # Busca o que entrou na aba desde a última vez. Devolve (registros, completo):
+    # completo=True quando a aba foi relida inteira e a base deve ser refeita.
+    def buscar(self):
+        self.quando = time.time()
+        if not self.cabecalho: return self._recarregar(), True
+
+        col = rowcol_to_a1(1, len(self.cabecalho)).rstrip('0123456789')
+        faixa = f"A{self.ultima_linha}:{col}"
+        cab, cauda = self._pool.ler('ler_cauda', self._aba, lambda w: w.batch_get(['1:1', faixa]), chave=faixa)
+        n = len(self.cabecalho)
+        cab = _cabecalho(cab[0] if cab else [])
+        if cab != self.cabecalho or not cauda or _ajustar(cauda[0], n) != self._ultima_valores:
+            return self._recarregar(), True
+
+        novas = [_ajustar(l, n) for l in cauda[1:]]
+        if novas:
+            self.ultima_linha += len(novas)
+            self._ultima_valores = novas[-1]
+        return normalizar_linhas(novas, self.cabecalho), False
+
+    # O log vem antes do snapshot: a compactação grava o snapshot antes de apagar
+    # o log, então nesta ordem nenhuma linha fica de fora (no pior caso, repetida).
+    def _recarregar(self):
+        valores = self._pool.ler('ler_tudo', self._aba, lambda w: w.get_values())
+        base = self._ler_snapshot()
+        if not valores:
+            self.cabecalho, self.ultima_linha, self._ultima_valores = [], 0, None
+            return base
+        self.cabecalho = _cabecalho(valores[0])
+        n = len(self.cabecalho)
+        linhas = [_ajustar(l, n) for l in valores[1:]]
+        self.ultima_linha = len(valores)
+        self._ultima_valores = linhas[-1] if linhas else _ajustar(valores[0], n)
+        return base + normalizar_linhas(linhas, self.cabecalho)
+
+    def _ler_snapshot(self):
+        try: valores = self._pool.ler('ler_snapshot', self._aba_snapshot, lambda w: w.get_values())
+        except gspread.exceptions.WorksheetNotFound: return []
+        if not valores: return []
+        cab = _cabecalho(valores[0])
+        return normalizar_linhas([_ajustar(l, len(cab)) for l in valores[1:]], cab)